@@ -1,6 +1,3 @@
-import asyncio
-import os
-
 from sqladmin import ModelView
 from wtforms import FileField
 from starlette.datastructures import UploadFile
@@ -16,7 +13,9 @@ from app.models.users import User
 from app.models.uploaded_documents import UploadedDocument
 from app.models.rag_documents import RagDocument
 from app.models.chat_logs import ChatLog
-from app.services.ai_service import process_and_embed_document
+from app.models.ingestion_jobs import IngestionJob
+from app.services.context_packer import count_tokens
+from app.services.ingestion_worker import enqueue_ingestion_job
 from app.services.image_service import optimize_image_bytes
 from app.services.storage_service import upload_file_to_r2
 
@@ -190,6 +189,14 @@ class RagDocumentAdmin(ModelView, model=RagDocument):
 
     column_list = [RagDocument.id, RagDocument.source, RagDocument.language, RagDocument.created_at]
 
+    # Deferred columns; showing them would need a lazy load the async session can't do
+    column_details_exclude_list = [
+        RagDocument.embedding,
+        RagDocument.embedding_half,
+        RagDocument.embedding_short,
+        RagDocument.search_vector,
+    ]
+
     form_columns = [
         RagDocument.source,
         RagDocument.content,
@@ -197,6 +204,11 @@ class RagDocumentAdmin(ModelView, model=RagDocument):
         RagDocument.active
     ]
 
+    async def on_model_change(self, data, model, is_created, request):
+        # pack_context budgets with the stored count, so keep it in step with edits
+        if 'content' in data:
+            data['token_count'] = count_tokens(data['content'] or '')
+
 
 class ChatLogAdmin(ModelView, model=ChatLog):
     name = 'Chat Log'
@@ -204,7 +216,7 @@ class ChatLogAdmin(ModelView, model=ChatLog):
     icon = 'fa-solid fa-comments'
     can_delete = True
 
-    column_list = [ChatLog.id, ChatLog.user_message, ChatLog.bot_reply, ChatLog.created_at]
+    column_list = [ChatLog.id, ChatLog.session_id, ChatLog.user_message, ChatLog.bot_reply, ChatLog.created_at]
 
 
 class UploadedDocumentAdmin(ModelView, model=UploadedDocument):
@@ -238,10 +250,35 @@ class UploadedDocumentAdmin(ModelView, model=UploadedDocument):
             data['file_path'] = public_url
             data['filename'] = upload_file.filename
 
-            asyncio.create_task(
-                process_and_embed_document(
-                    file_bytes=content,
-                    filename=upload_file.filename,
-                    language=data.get('language', 'en')
-                )
+    async def after_model_change(self, data, model, is_created, request):
+        # Enqueued only once the document row is committed, so a worker can
+        # never claim a job for an upload that does not exist (yet)
+        if is_created and model.file_path:
+            # Embedding runs in the ingestion worker; progress shows up under Ingestion Jobs
+            await enqueue_ingestion_job(
+                filename=model.filename,
+                file_key=f'ragdocs/{model.filename}',
+                language=model.language or 'en'
             )
+
+
+class IngestionJobAdmin(ModelView, model=IngestionJob):
+    name = 'Ingestion Job'
+    name_plural = 'Ingestion Jobs'
+    icon = 'fa-solid fa-list-check'
+    can_create = False
+    can_edit = False
+    can_delete = True
+
+    column_list = [
+        IngestionJob.id,
+        IngestionJob.filename,
+        IngestionJob.language,
+        IngestionJob.status,
+        IngestionJob.progress,
+        IngestionJob.attempts,
+        IngestionJob.last_error,
+        IngestionJob.updated_at
+    ]
+
+    column_default_sort = [(IngestionJob.id, True)]
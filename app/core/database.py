@@ -1,3 +1,8 @@
+import time
+from collections import deque
+
+from pgvector.asyncpg import register_vector
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from app.core.settings import settings
@@ -10,6 +15,69 @@ engine = create_async_engine(
     connect_args={"statement_cache_size": 0},  # Neon pooler (PgBouncer) compatibility
 )
 
+
+@event.listens_for(engine.sync_engine, 'connect')
+def _register_vector_codec(dbapi_connection, connection_record):
+    # Binary codec for vector columns (see app.models.types.BinaryVector)
+    dbapi_connection.run_async(register_vector)
+
+
+class PoolMetrics:
+    """
+    How long connections stay checked out of the pool, from pool events.
+
+    Long hold times mean a request keeps a connection across slow work
+    (LLM calls, streaming) instead of returning it after its queries.
+    """
+
+    def __init__(self, samples: int = 1000):
+        self.hold_seconds: deque = deque(maxlen=samples)
+        self.checkouts = 0
+        self.max_hold_seconds = 0.0
+
+    def checked_out(self, connection_record) -> None:
+        self.checkouts += 1
+        connection_record.info['checked_out_at'] = time.monotonic()
+
+    def checked_in(self, connection_record) -> None:
+        started_at = connection_record.info.pop('checked_out_at', None)
+        if started_at is None:
+            return
+        held = time.monotonic() - started_at
+        self.hold_seconds.append(held)
+        self.max_hold_seconds = max(self.max_hold_seconds, held)
+
+    def stats(self) -> dict:
+        ordered = sorted(self.hold_seconds)
+
+        def percentile(q: float) -> float | None:
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 4) if ordered else None
+
+        pool = engine.sync_engine.pool
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'checkouts': self.checkouts,
+            'hold_p50_seconds': percentile(0.5),
+            'hold_p95_seconds': percentile(0.95),
+            'hold_max_seconds': round(self.max_hold_seconds, 4),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+@event.listens_for(engine.sync_engine, 'checkout')
+def _record_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.checked_out(connection_record)
+
+
+@event.listens_for(engine.sync_engine, 'checkin')
+def _record_checkin(dbapi_connection, connection_record):
+    pool_metrics.checked_in(connection_record)
+
+
 async def get_session():
     async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
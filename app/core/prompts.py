@@ -198,4 +198,21 @@ CONTEXT - YOUR ONLY SOURCE OF TRUTH
 REMEMBER: If it's not in the context above, you DON'T know it. Direct them 
 to reach out through site's contact form.
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
\ No newline at end of file
+"""
+
+CONVERSATION_SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a visitor and MatIAs, the digital twin of Matías Estigarribia.
+
+Update the existing summary with the new messages below. Keep:
+- What the visitor is interested in (role, company, project, questions asked)
+- The facts about Matías that were already shared in the answers
+- Any open question or commitment still pending
+
+Write at most 150 words, in the same language as the conversation. Do not add information that is not in the messages. Output only the summary.
+
+EXISTING SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{messages}
+"""
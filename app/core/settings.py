@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -22,6 +24,100 @@ class Settings(BaseSettings):
     BACKUP_LLM: str
     EMBEDDING_MODEL: str
 
+    # LLM routing: hedge to the backup past the primary's p95 time-to-first-token
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_DEFAULT_SECONDS: float = 2.0
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    LLM_CIRCUIT_OPEN_SECONDS: float = 30.0
+
+    # Candidate list size for HNSW scans (higher = better recall, slower)
+    HNSW_EF_SEARCH: int = 40
+
+    # Stored embedding to search: 'full' (vector) or 'half' (halfvec, half the index size)
+    EMBEDDING_PRECISION: Literal['full', 'half'] = 'full'
+
+    # Two-stage retrieval: ANN over 256-dim embeddings, re-rank candidates at full size
+    TWO_STAGE_RETRIEVAL: bool = False
+    TWO_STAGE_CANDIDATES: int = 50
+
+    # Hybrid retrieval: full-text + vector, fused with reciprocal rank fusion
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_CANDIDATES: int = 20
+    RRF_K: int = 60
+
+    # Prompt budgets (tokens) for retrieved context and conversation history
+    CONTEXT_TOKEN_BUDGET: int = 2000
+    HISTORY_TOKEN_BUDGET: int = 1500
+
+    # Embedding-based off-topic check (nearest intent centroid)
+    SEMANTIC_GUARDRAIL_ENABLED: bool = True
+    SEMANTIC_GUARDRAIL_MARGIN: float = 0.05
+
+    # Long conversations: older turns are folded into a cached running summary
+    CONVERSATION_SUMMARY_ENABLED: bool = True
+    CONVERSATION_SUMMARY_TRIGGER_MESSAGES: int = 12
+    CONVERSATION_SUMMARY_KEEP_MESSAGES: int = 6
+    CONVERSATION_SUMMARY_MAX_ENTRIES: int = 1024
+
+    # Opt-in server-side chat sessions
+    CHAT_SESSION_CACHE_SIZE: int = 1000
+    CHAT_SESSION_IDLE_SECONDS: int = 1800
+    CHAT_SESSION_MAX_MESSAGES: int = 40
+
+    # Write-behind batching of chat_logs inserts
+    CHAT_LOG_WRITE_BEHIND: bool = True
+    CHAT_LOG_BATCH_SIZE: int = 50
+    CHAT_LOG_FLUSH_MS: int = 1000
+    CHAT_LOG_MAX_PENDING: int = 5000
+
+    # Optional in-process retrieval (NumPy matrix per language, mmap snapshot)
+    VECTOR_INDEX_ENABLED: bool = False
+    VECTOR_INDEX_DIR: str = 'var/vector_index'
+    VECTOR_INDEX_REFRESH_SECONDS: int = 300
+
+    # Query embedding cache (in-process LRU backed by the embedding_cache table)
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 2048
+    EMBEDDING_CACHE_TTL_SECONDS: int = 3600
+    EMBEDDING_CACHE_PERSISTENT: bool = True
+    # Persisted embeddings unused for this long are pruned
+    EMBEDDING_CACHE_PERSISTENT_TTL_SECONDS: int = 2592000
+
+    # Semantic cache of first-turn answers
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY: float = 0.95
+    ANSWER_CACHE_MAX_ENTRIES: int = 512
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_VERSION_CHECK_SECONDS: int = 30
+
+    # Single-flight of identical concurrent questions and Idempotency-Key retries
+    REQUEST_COALESCING_ENABLED: bool = True
+    IDEMPOTENCY_RETAIN_SECONDS: int = 300
+
+    # Max chunks buffered between the LLM and a slow SSE client
+    STREAM_BUFFER_CHUNKS: int = 64
+
+    # Resumable streams (Last-Event-ID replay)
+    STREAM_REPLAY_SECONDS: int = 300
+    STREAM_RESUME_GRACE_SECONDS: int = 5
+
+    # SSE framing: tokens are joined per frame over a time window / size cap
+    SSE_COALESCE_MS: int = 50
+    SSE_MAX_FRAME_CHARS: int = 512
+
+    # Document ingestion
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 5
+    INGESTION_COMMIT_BATCH_SIZE: int = 128
+
+    # Durable ingestion job queue
+    INGESTION_WORKER_ENABLED: bool = True
+    INGESTION_WORKER_CONCURRENCY: int = 1
+    INGESTION_WORKER_POLL_SECONDS: float = 10.0
+    INGESTION_JOB_MAX_ATTEMPTS: int = 5
+    INGESTION_JOB_RETRY_BASE_SECONDS: int = 30
+    INGESTION_JOB_STALE_SECONDS: int = 300
+
     R2_ENDPOINT_URL: str
     R2_ACCESS_KEY: str
     R2_SECRET_KEY: str
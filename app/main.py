@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -24,10 +27,12 @@ from app.admin.views import (
     RagDocumentAdmin,
     ChatLogAdmin,
     UploadedDocumentAdmin,
+    IngestionJobAdmin,
 )
 
-from app.core.database import engine, get_session
+from app.core.database import engine, get_session, pool_metrics
 from app.core.rate_limit import limiter
+from app.core.settings import settings
 from app.routers import (
     contact_messages,
     experiences,
@@ -38,11 +43,53 @@ from app.routers import (
     chat,
     pages
 )
+from app.services.ai_service import get_embedding, robust_llm
+from app.services.answer_cache import answer_cache
+from app.services.chat_log_writer import chat_log_writer
+from app.services.chat_sessions import chat_session_store
+from app.services.conversation_summary import conversation_summarizer
+from app.services.embedding_cache import embedding_cache
+from app.services.ingestion_worker import ingestion_worker
+from app.services.request_coalescer import request_coalescer
+from app.services.semantic_guardrail import semantic_guardrail
+from app.services.stream_relay import stream_metrics
+from app.services.vector_index import vector_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.VECTOR_INDEX_ENABLED:
+        try:
+            await vector_index.load()
+        except Exception as e:
+            # Retrieval falls back to pgvector for languages that failed to load
+            print(f"⚠️  Failed to load in-memory vector index: {e}")
+
+    if settings.INGESTION_WORKER_ENABLED:
+        ingestion_worker.start()
+
+    if settings.CHAT_LOG_WRITE_BEHIND:
+        chat_log_writer.start()
+
+    # Built in the background; until it is ready queries are simply not guarded
+    guardrail_task = None
+    if settings.SEMANTIC_GUARDRAIL_ENABLED:
+        guardrail_task = asyncio.create_task(semantic_guardrail.load(get_embedding))
+
+    yield
+
+    if guardrail_task is not None:
+        guardrail_task.cancel()
+    await ingestion_worker.stop()
+    # Drain buffered chat logs before the process exits
+    await chat_log_writer.stop()
+
 
 app = FastAPI(
     title="Live CV & Digital Twin API",
     description="The backend engine for Matias Estigarribia's interactive portfolio.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.mount('/static', StaticFiles(directory='static'), name='static')
@@ -55,6 +102,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['X-Chat-Session-Id', 'X-Chat-Stream-Id'],
 )
 
 templates = Jinja2Templates(directory='templates')
@@ -124,6 +172,7 @@ admin.add_view(ProjectImageAdmin)
 admin.add_view(ChatLogAdmin)
 admin.add_view(RagDocumentAdmin)
 admin.add_view(UploadedDocumentAdmin)
+admin.add_view(IngestionJobAdmin)
 
 
 @app.get('/health')
@@ -137,7 +186,17 @@ async def health_check(db: AsyncSession = Depends(get_session)):
         return {
             "status": "online",
             "database": "connected",
-            "message": "System nominal. Server and Database are warm."
+            "message": "System nominal. Server and Database are warm.",
+            "embedding_cache": embedding_cache.stats(),
+            "answer_cache": answer_cache.stats(),
+            "conversation_summary": conversation_summarizer.stats(),
+            "chat_sessions": chat_session_store.stats(),
+            "chat_log_writer": chat_log_writer.stats(),
+            "llm_router": robust_llm.stats(),
+            "semantic_guardrail": semantic_guardrail.stats(),
+            "request_coalescer": request_coalescer.stats(),
+            "streams": stream_metrics.stats(),
+            "db_pool": pool_metrics.stats()
         }
     except Exception as e:
         return {
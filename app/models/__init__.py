@@ -7,6 +7,9 @@ from app.models.projects import Project, project_skills
 from app.models.skills import Skill
 from app.models.spoken_languages import SpokenLanguage
 from app.models.rag_documents import RagDocument
+from app.models.chat_sessions import ChatSession
 from app.models.chat_logs import ChatLog
 from app.models.uploaded_documents import UploadedDocument
 from app.models.project_images import ProjectImage
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.models.ingestion_jobs import IngestionJob
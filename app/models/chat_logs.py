@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import func, Text
+from sqlalchemy import func, ForeignKey, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models import Base
@@ -10,6 +10,10 @@ class ChatLog(Base):
     __tablename__ = 'chat_logs'
 
     id: Mapped[int] = mapped_column(primary_key=True)
+    session_id: Mapped[str | None] = mapped_column(
+        ForeignKey('chat_sessions.id', ondelete='SET NULL'),
+        index=True,
+    )
     user_message: Mapped[str] = mapped_column(Text)
     bot_reply: Mapped[str] = mapped_column(Text)
     language: Mapped[str]
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import func, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class ChatSession(Base):
+    __tablename__ = 'chat_sessions'
+    __table_args__ = (
+        Index('ix_chat_sessions_last_active_at', 'last_active_at'),
+    )
+
+    # Opaque id handed to the client (uuid4 hex)
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    language: Mapped[str] = mapped_column(String(10), default='en')
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+    )
+    last_active_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+    )
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import func, Index, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+from app.models.types import BinaryVector
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = 'embedding_cache'
+    __table_args__ = (
+        Index('ix_embedding_cache_last_used_at', 'last_used_at'),
+    )
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(100))
+    query_text: Mapped[str] = mapped_column(Text)
+    embedding: Mapped[list[float]] = mapped_column(BinaryVector(1536))
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+    )
+    # Refreshed on every read from the table; drives the TTL prune
+    last_used_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+    )
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import func, Index, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class IngestionJob(Base):
+    __tablename__ = 'ingestion_jobs'
+    __table_args__ = (
+        Index('ix_ingestion_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    filename: Mapped[str] = mapped_column(String(255))
+    file_key: Mapped[str] = mapped_column(String(512))
+    language: Mapped[str] = mapped_column(String(10), default='en')
+    # pending -> running -> done | failed (running jobs go back to pending on retry)
+    status: Mapped[str] = mapped_column(String(20), default='pending')
+    progress: Mapped[int] = mapped_column(default=0)
+    attempts: Mapped[int] = mapped_column(default=0)
+    last_error: Mapped[str | None] = mapped_column(Text)
+    run_after: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+    )
+    heartbeat_at: Mapped[datetime | None]
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    def __str__(self):
+        return f'{self.filename} ({self.status})'
@@ -1,23 +1,102 @@
+import hashlib
 from datetime import datetime
 
-from sqlalchemy import func, Boolean, String, Text
+import numpy as np
+from sqlalchemy import event, func, Boolean, Computed, Index, String, Text, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 
-from pgvector.sqlalchemy import Vector
-
 from app.models.base import Base
+from app.models.types import BinaryHalfVector, BinaryVector
+
+
+RAG_LANGUAGES = ('en', 'es', 'pt')
+
+# Leading dimensions kept in embedding_short (text-embedding-3 models are Matryoshka-trained)
+SHORT_EMBEDDING_DIM = 256
+
+# Postgres text search configuration used for each language
+TEXT_SEARCH_CONFIGS = {'en': 'english', 'es': 'spanish', 'pt': 'portuguese'}
+
+# One branch per language keeps the generated column immutable
+SEARCH_VECTOR_EXPRESSION = (
+    'CASE language '
+    + ' '.join(
+        f"WHEN '{language}' THEN to_tsvector('{config}'::regconfig, content)"
+        for language, config in TEXT_SEARCH_CONFIGS.items()
+    )
+    + " ELSE to_tsvector('simple'::regconfig, content) END"
+)
+
+
+def compute_content_hash(content: str) -> str:
+    """SHA-256 hex digest of a chunk, matching the SQL backfill in the migration."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def shorten_embedding(vector) -> np.ndarray:
+    """
+    Truncates an embedding to SHORT_EMBEDDING_DIM and re-normalizes it, which is
+    what the API's `dimensions` parameter does. Matches the SQL backfill.
+    """
+    short = np.asarray(vector, dtype=np.float32)[:SHORT_EMBEDDING_DIM]
+    norm = np.linalg.norm(short)
+    return short / norm if norm else short
+
+
+def _hnsw_index(language: str, column: str = 'embedding', ops: str = 'vector_cosine_ops') -> Index:
+    """Partial HNSW index over the active chunks of a single language."""
+    return Index(
+        f'ix_rag_documents_{column}_hnsw_{language}',
+        column,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={column: ops},
+        postgresql_where=text(f"active = true AND language = '{language}'"),
+    )
 
 
 class RagDocument(Base):
     __tablename__ = 'rag_documents'
+    __table_args__ = (
+        Index('ix_rag_documents_source_language_hash', 'source', 'language', 'content_hash'),
+        Index('ix_rag_documents_search_vector', 'search_vector', postgresql_using='gin'),
+        *(_hnsw_index(language) for language in RAG_LANGUAGES),
+        *(_hnsw_index(language, 'embedding_half', 'halfvec_cosine_ops') for language in RAG_LANGUAGES),
+        *(_hnsw_index(language, 'embedding_short') for language in RAG_LANGUAGES),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     source: Mapped[str] = mapped_column(String(255))
     content: Mapped[str] = mapped_column(Text)
+    content_hash: Mapped[str] = mapped_column(String(64))
+    token_count: Mapped[int] = mapped_column(default=0)
     language: Mapped[str] = mapped_column(String(10), default='en')
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        deferred=True,
+    )
 
-    embedding: Mapped[list[float]] = mapped_column(Vector(1536))
+    # Deferred: loading a RagDocument (admin lists, ORM queries) skips the 1536 floats
+    embedding: Mapped[list[float]] = mapped_column(BinaryVector(1536), deferred=True)
+    # Same vector at half precision, searched when EMBEDDING_PRECISION=half
+    embedding_half: Mapped[list[float] | None] = mapped_column(BinaryHalfVector(1536), deferred=True)
+    # Normalized leading dimensions, for the coarse pass of two-stage retrieval
+    embedding_short: Mapped[list[float] | None] = mapped_column(BinaryVector(SHORT_EMBEDDING_DIM), deferred=True)
     active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(
         server_default=func.now(),
     )
+    # Bumped by every ORM/Core update, so the in-memory vector index sees admin edits
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+
+@event.listens_for(RagDocument, 'before_insert')
+@event.listens_for(RagDocument, 'before_update')
+def _sync_content_hash(mapper, connection, target):
+    # Keeps the hash right for ORM writes (e.g. admin edits); bulk inserts pass it explicitly
+    target.content_hash = compute_content_hash(target.content)
@@ -0,0 +1,35 @@
+import numpy as np
+from pgvector.sqlalchemy import HALFVEC, Vector
+
+
+class _BinaryBindMixin:
+    """
+    Binds numpy float32 arrays instead of pgvector's text format.
+
+    On asyncpg, app.core.database registers pgvector's binary codecs on every
+    connection, so vectors travel as packed buffers and load back as numpy
+    arrays. Other drivers keep pgvector's text format.
+    """
+
+    def bind_processor(self, dialect):
+        if dialect.driver != 'asyncpg':
+            return super().bind_processor(dialect)
+
+        def process(value):
+            if value is None:
+                return None
+            value = np.asarray(value, dtype=np.float32)
+            if self.dim is not None and value.shape != (self.dim,):
+                raise ValueError(f'expected {self.dim} dimensions, not {value.shape}')
+            return value
+        return process
+
+
+class BinaryVector(_BinaryBindMixin, Vector):
+    """`vector(n)`: 4 bytes per dimension."""
+    cache_ok = True
+
+
+class BinaryHalfVector(_BinaryBindMixin, HALFVEC):
+    """`halfvec(n)`: 2 bytes per dimension; the codec converts float32 to float16."""
+    cache_ok = True
@@ -1,21 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.responses import StreamingResponse
+import hashlib
+import secrets
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from slowapi.util import get_remote_address
 
-from app.core.database import get_session
-from app.models.chat_logs import ChatLog
 from app.schemas.chat import ChatRequestSchema, ChatResponseSchema
 from app.services.ai_service import (
     get_digital_twin_response,
+    save_chat_log,
     stream_digital_twin_response,
     UnsupportedLanguageError,
+    validate_language,
 )
+from app.services.chat_sessions import chat_session_store
+from app.services.request_coalescer import request_coalescer, Subscription
+from app.services.sse_writer import coalesce, format_comment, format_event
+from app.services.stream_relay import relay
 from app.core.rate_limit import limiter
+from app.core.settings import settings
 
 
 router = APIRouter()
 
+SESSION_HEADER = 'X-Chat-Session-Id'
+STREAM_HEADER = 'X-Chat-Stream-Id'
+RESUMABLE_HEADER = 'X-Chat-Resumable'
+
+
+def unsupported_language_error(e: UnsupportedLanguageError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={
+            "error": "unsupported_language",
+            "message": e.message,
+            "requested_language": e.language,
+            "supported_languages": ["en", "es", "pt"]
+        }
+    )
+
+
+async def resolve_chat_session(payload: ChatRequestSchema) -> tuple[str | None, list[dict] | None]:
+    """
+    Returns (session_id, history) for session-mode requests, where history
+    comes from the server instead of payload.chat_history.
+
+    Raises:
+        HTTPException: 404 if the session does not exist or has expired,
+            400 if a new session is requested for an unsupported language
+    """
+    if payload.session_id:
+        history = await chat_session_store.get_history(payload.session_id)
+        if history is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "error": "session_not_found",
+                    "message": "This conversation has expired. Please start a new one."
+                }
+            )
+        return payload.session_id, history
+
+    if payload.start_session:
+        # Validate first, so a bad language never leaves an orphan session behind
+        try:
+            language = validate_language(payload.language)
+        except UnsupportedLanguageError as e:
+            raise unsupported_language_error(e)
+        return await chat_session_store.create(language), []
+
+    return None, None
+
+
+async def run_idempotent(
+    request: Request,
+    payload: ChatRequestSchema,
+    scope: str,
+    idempotency_key: str,
+    factory: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Runs `factory` once per client and Idempotency-Key, replaying its result
+    to retries for IDEMPOTENCY_RETAIN_SECONDS.
+
+    Keys are scoped to the chat session when there is one, otherwise to the
+    client address (the rate-limit key, which is the visitor's and not the
+    proxy's once FORWARDED_ALLOW_IPS trusts the proxy), so another visitor
+    reusing a key never gets this one's answer, stream or session.
+
+    Raises:
+        HTTPException: 422 if the key was already used with a different payload
+    """
+    fingerprint = hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+    async def fingerprinted() -> tuple[str, Any]:
+        return fingerprint, await factory()
+
+    client = ('session', payload.session_id) if payload.session_id else ('address', get_remote_address(request))
+
+    first_fingerprint, result = await request_coalescer.run_once(
+        ('idempotency', scope, client, idempotency_key),
+        fingerprinted,
+        retain_seconds=settings.IDEMPOTENCY_RETAIN_SECONDS
+    )
+
+    if first_fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail={
+                "error": "idempotency_key_reused",
+                "message": "This Idempotency-Key was already used with a different request."
+            }
+        )
+    return result
+
 
 @router.post(
     path='/',
@@ -27,7 +127,7 @@ router = APIRouter()
 async def ask_digital_twin(
     request: Request,
     payload: ChatRequestSchema,
-    db: AsyncSession = Depends(get_session)
+    idempotency_key: str | None = Header(default=None, alias='Idempotency-Key', max_length=128)
 ):
     """
     Main chat endpoint for MatIAs digital twin.
@@ -38,46 +138,39 @@ async def ask_digital_twin(
     - Conversation logging (with graceful failure)
 
     Returns the bot's response even if logging fails.
+
+    Session mode: send `start_session: true` to get a `session_id`, then
+    send only `session_id` and `message`; the server keeps the history.
+
+    Retries from the same client carrying the same `Idempotency-Key` header
+    and payload (while the first attempt is running or within
+    IDEMPOTENCY_RETAIN_SECONDS after it) get the same response without
+    generating or logging the turn again; a different payload gets 422.
     """
 
-    try:
+    async def answer() -> ChatResponseSchema:
+        session_id, session_history = await resolve_chat_session(payload)
+
         # Get response from digital twin (will raise UnsupportedLanguageError if invalid)
         actual_reply = await get_digital_twin_response(
             query=payload.message,
             language=payload.language,
-            db=db
+            chat_history=session_history
         )
 
-        # Try to log the conversation (but don't fail if this breaks)
-        try:
-            chat_log = ChatLog(
-                user_message=payload.message,
-                bot_reply=actual_reply,
-                language=payload.language
-            )
-            db.add(chat_log)
-            await db.commit()
+        # Log the conversation in its own short transaction (never fails the request)
+        await save_chat_log(payload.message, actual_reply, payload.language, session_id)
 
-        except Exception as db_error:
-            # Log the database error but don't fail the request
-            print(f"⚠️  Failed to save chat log to database: {db_error}")
-            # Rollback to prevent hanging transactions
-            await db.rollback()
-            # Continue - user still gets their response
+        return ChatResponseSchema(reply=actual_reply, session_id=session_id)
 
-        return ChatResponseSchema(reply=actual_reply)
+    try:
+        if idempotency_key:
+            return await run_idempotent(request, payload, 'chat', idempotency_key, answer)
+        return await answer()
 
     except UnsupportedLanguageError as e:
         # Handle unsupported language gracefully - return 400 Bad Request
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={
-                "error": "unsupported_language",
-                "message": e.message,
-                "requested_language": e.language,
-                "supported_languages": ["en", "es", "pt"]
-            }
-        )
+        raise unsupported_language_error(e)
 
     except HTTPException:
         # Re-raise HTTP exceptions (like 400, 404, etc.)
@@ -105,39 +198,150 @@ async def ask_digital_twin(
 async def stream_digital_twin(
     request: Request,
     payload: ChatRequestSchema,
-    db: AsyncSession = Depends(get_session)
+    idempotency_key: str | None = Header(default=None, alias='Idempotency-Key', max_length=128),
+    resumable: bool = Header(default=False, alias=RESUMABLE_HEADER)
 ):
     """
     Streaming chat endpoint for MatIAs digital twin.
 
-    Returns a text/event-stream response where each SSE frame carries one
-    text chunk from the LLM.  The stream ends with `data: [DONE]`.
+    Returns a text/event-stream response. It opens with a `: connected`
+    comment, then sends `chunk` events carrying the reply text (tokens
+    joined over SSE_COALESCE_MS, newlines as multi-line `data:` fields),
+    an `error` event if something fails, and ends with a `done` event.
 
     Client-side: consume with the native Fetch API + ReadableStream.
     Do NOT use HTMX for this endpoint — HTMX does not support streaming.
+
+    In session mode the session id is returned in the X-Chat-Session-Id
+    header and payload.chat_history is ignored.
+
+    Every stream gets an id (X-Chat-Stream-Id header) and its events carry
+    `id:` fields. If the connection drops, GET /stream/{stream_id}/ with
+    the last received id as `Last-Event-ID` resumes it without generating
+    the answer again. Only clients sending `X-Chat-Resumable: true` keep
+    the generation running for STREAM_RESUME_GRACE_SECONDS after a drop;
+    for everyone else it stops as soon as they go away.
+
+    A retry from the same client with the same `Idempotency-Key` header and
+    payload attaches to the original stream (replaying the chunks already
+    sent) instead of starting a new one; a different payload gets 422.
+    """
+
+    async def open_stream() -> tuple[str, str | None, list[dict] | None]:
+        session_id, session_history = await resolve_chat_session(payload)
+        return secrets.token_urlsafe(12), session_id, session_history
+
+    if idempotency_key:
+        # A retry lands on the same stream (and session) as the first attempt
+        stream_id, session_id, session_history = await run_idempotent(
+            request, payload, 'stream', idempotency_key, open_stream
+        )
+    else:
+        stream_id, session_id, session_history = await open_stream()
+    chat_history = session_history if session_id else payload.chat_history
+
+    def reply_chunks():
+        return stream_digital_twin_response(
+            query=payload.message,
+            language=payload.language,
+            chat_history=chat_history,
+            session_id=session_id,
+        )
+
+    # The generation runs detached from this connection: its chunks stay
+    # replayable for STREAM_REPLAY_SECONDS and, for clients that resume,
+    # it survives a dropped connection for STREAM_RESUME_GRACE_SECONDS
+    chunks = request_coalescer.stream(
+        ('stream', stream_id),
+        reply_chunks,
+        retain_seconds=settings.STREAM_REPLAY_SECONDS,
+        grace_seconds=settings.STREAM_RESUME_GRACE_SECONDS
+    )
+
+    headers = {STREAM_HEADER: stream_id}
+    if session_id:
+        headers[SESSION_HEADER] = session_id
+
+    return sse_response(request, chunks, 0, headers, resumable)
+
+
+@router.get(
+    path='/stream/{stream_id}/',
+    summary='Resume a dropped response stream (SSE)',
+)
+@limiter.limit('30/minute')
+async def resume_digital_twin_stream(
+    request: Request,
+    stream_id: str,
+    last_event_id: int = Header(default=0, alias='Last-Event-ID', ge=0)
+):
+    """
+    Resumes a stream started by POST /stream/ after the `Last-Event-ID`
+    event, attaching to the generation if it is still running.
+
+    Raises:
+        HTTPException: 404 if the stream is unknown, failed or expired
+    """
+    chunks = request_coalescer.attach(('stream', stream_id))
+    if chunks is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "stream_not_found",
+                "message": "This answer is no longer available. Please ask again."
+            }
+        )
+
+    return sse_response(request, chunks, last_event_id, {STREAM_HEADER: stream_id}, resumable=True)
+
+
+def sse_response(
+    request: Request,
+    chunks: Subscription,
+    offset: int,
+    headers: dict[str, str],
+    resumable: bool
+) -> StreamingResponse:
+    """
+    Streams `chunks` as SSE, starting `offset` characters into the reply.
+
+    Event ids are character offsets into the reply, so a client resuming
+    with the id of the last event it saw gets exactly the rest.
+
+    If the client goes away without being able to resume (not `resumable`,
+    or nothing of the reply was delivered yet), the subscription is
+    abandoned so the generation stops without waiting out its grace period.
     """
 
     async def sse_generator():
+        # First bytes go out before embedding/retrieval, so time-to-first-byte is near zero
+        position = offset
+
         try:
-            async for chunk in stream_digital_twin_response(
-                query=payload.message,
-                language=payload.language,
-                db=db,
-                chat_history=payload.chat_history,
-            ):
-                # Escape newlines so each SSE frame stays on one logical line
-                safe_chunk = chunk.replace('\n', '\\n')
-                yield f"data: {safe_chunk}\n\n"
+            yield format_comment('connected')
 
-        except UnsupportedLanguageError as e:
-            yield f"data: [ERROR] {e.message}\n\n"
+            try:
+                async for text in coalesce(
+                    relay(skip_chars(chunks, offset), request, settings.STREAM_BUFFER_CHUNKS),
+                    window_seconds=settings.SSE_COALESCE_MS / 1000,
+                    max_chars=settings.SSE_MAX_FRAME_CHARS
+                ):
+                    position += len(text)
+                    yield format_event(text, event='chunk', id=str(position))
+
+            except UnsupportedLanguageError as e:
+                yield format_event(e.message, event='error')
+
+            except Exception as e:
+                print(f"❌ Unexpected streaming error: {e}")
+                yield format_event("I'm experiencing technical difficulties. Please try again.", event='error')
 
-        except Exception as e:
-            print(f"❌ Unexpected streaming error: {e}")
-            yield "data: [ERROR] I'm experiencing technical difficulties. Please try again.\n\n"
+            yield format_event('[DONE]', event='done', id=str(position))
 
         finally:
-            yield "data: [DONE]\n\n"
+            # A no-op once the reply finished; otherwise the client is gone
+            if not resumable or position == 0:
+                chunks.abandon()
 
     return StreamingResponse(
         sse_generator(),
@@ -145,5 +349,17 @@ async def stream_digital_twin(
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",   # disable Nginx buffering if proxied
+            **headers,
         },
     )
+
+
+async def skip_chars(chunks: AsyncIterator[str], offset: int) -> AsyncGenerator[str, None]:
+    """Drops the first `offset` characters of a (replayed) reply."""
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            if offset >= len(chunk):
+                offset -= len(chunk)
+                continue
+            yield chunk[offset:]
+            offset = 0
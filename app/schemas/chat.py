@@ -7,7 +7,11 @@ class ChatRequestSchema(BaseModel):
     message: str = Field(..., min_length=2, max_length=1500)
     language: str = Field(default='en', max_length=10)
     chat_history: Optional[List[Dict[str, str]]] = Field(default=None)
+    # Opt-in server-side history: send start_session once, then only session_id + message
+    start_session: bool = Field(default=False)
+    session_id: Optional[str] = Field(default=None, max_length=32)
 
 
 class ChatResponseSchema(BaseModel):
     reply: str
+    session_id: Optional[str] = None
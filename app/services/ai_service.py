@@ -1,24 +1,46 @@
-import tempfile
+import io
 import os
 import asyncio
-from typing import AsyncGenerator
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterator, Awaitable, BinaryIO, Callable
 
 from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
 
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import engine
 from app.core.settings import settings
-from app.core.prompts import DIGITAL_TWIN_SYSTEM_PROMPT
-
-from app.models.rag_documents import RagDocument
+from app.core.prompts import CONVERSATION_SUMMARY_PROMPT, DIGITAL_TWIN_SYSTEM_PROMPT
+
+from app.models.rag_documents import RagDocument, compute_content_hash, shorten_embedding
+from app.services.answer_cache import (
+    answer_cache,
+    bump_corpus_version,
+    get_corpus_version,
+    split_for_replay,
+    sync_corpus_version,
+)
+from app.services.chat_log_writer import chat_log_writer
+from app.services.chat_sessions import chat_session_store
+from app.services.context_packer import count_tokens, pack_context, pack_history
+from app.services.conversation_summary import conversation_summarizer
+from app.services.embedding_batcher import embed_in_batches
+from app.services.embedding_cache import embedding_cache, normalize_query
+from app.services.llm_router import LLMRouter
+from app.services.query_filter import query_filter
+from app.services.request_coalescer import request_coalescer
+from app.services.retrieval_service import search_similar_documents
+from app.services.semantic_guardrail import semantic_guardrail
+from app.services.stream_relay import stream_metrics
+from app.services.vector_index import vector_index
 
 
 # ============================================================================
@@ -54,8 +76,15 @@ backup_llm = ChatOpenAI(
     temperature=0.3
 )
 
-# High availability LLM with automatic fallback
-robust_llm = primary_llm.with_fallbacks([backup_llm])
+# High availability LLM: circuit breaker + hedged requests between providers
+robust_llm = LLMRouter(
+    primary=primary_llm,
+    backup=backup_llm,
+    hedge_enabled=settings.LLM_HEDGE_ENABLED,
+    default_hedge_seconds=settings.LLM_HEDGE_DEFAULT_SECONDS,
+    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    open_seconds=settings.LLM_CIRCUIT_OPEN_SECONDS,
+)
 
 
 # ============================================================================
@@ -71,6 +100,23 @@ prompt_template = ChatPromptTemplate.from_messages([
 # The RAG chain
 rag_chain = prompt_template | robust_llm | StrOutputParser()
 
+# Background summaries: failover only, no hedging (nobody waits on their
+# first token), and their latency stays out of the chat router's p95
+summary_llm = LLMRouter(
+    primary=primary_llm,
+    backup=backup_llm,
+    hedge_enabled=False,
+    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    open_seconds=settings.LLM_CIRCUIT_OPEN_SECONDS,
+)
+
+# Folds older turns of long conversations into a running summary
+summary_chain = (
+    ChatPromptTemplate.from_template(CONVERSATION_SUMMARY_PROMPT)
+    | summary_llm
+    | StrOutputParser()
+)
+
 
 # ============================================================================
 # GREETING MESSAGES (Multi-language)
@@ -163,67 +209,196 @@ def validate_language(language: str) -> str:
 
 
 def is_greeting(query: str) -> bool:
-    """Detects if the user's message is a greeting."""
-    greetings = [
-        'hi', 'hello', 'hey', 'hola', 'ola', 'olá',
-        'good morning', 'good afternoon', 'good evening',
-        'buenos días', 'buenas tardes', 'buenas noches',
-        'bom dia', 'boa tarde', 'boa noite'
-    ]
-    query_lower = query.lower().strip()
-
-    # Check if it's JUST a greeting (not "hi, what's your experience with Python?")
-    return query_lower in greetings or (
-        any(greeting in query_lower for greeting in greetings) and len(query.split()) <= 3
-    )
+    """
+    Detects if the user's message is JUST a greeting (not "hi, what's your
+    experience with Python?").
+    """
+    return query_filter.is_greeting(query)
 
 
 def should_block_query(query: str) -> tuple[bool, str | None]:
     """
     Pre-filters obviously off-topic queries to save tokens.
     Returns (should_block, optional_reason).
+
+    Patterns live in app/data/query_filters/<language>.json and are matched
+    accent-insensitively, so only one spelling of each phrase is needed.
     """
-    hard_off_topic = [
-        # English
-        'weather', 'recipe for', 'cook a', 'bake a',
-        'movie recommendation', 'what movie', 'what series',
-        'game recommendation', 'sports score', 'who won the game',
-        'write this code', 'debug this', 'fix this code', 'solve this problem for me',
-        'stock price', 'bitcoin price', 'crypto price',
-        'news about', 'latest news', 'current events',
-
-        # Spanish (Includes unaccented versions for robust matching)
-        'clima', 'pronóstico', 'pronostico', 'receta para', 'receta de', 'cocinar un', 'hornear un',
-        'recomendación de película', 'recomendacion de pelicula', 'qué película', 'que pelicula',
-        'qué serie', 'que serie', 'recomendación de juego', 'recomendacion de juego',
-        'resultado del partido', 'marcador', 'quién ganó', 'quien gano',
-        'escribe este código', 'escribe este codigo', 'escribime un', 'depurar esto',
-        'arregla este código', 'arregla este codigo', 'resuelve este problema', 'resolvé este',
-        'precio de las acciones', 'cotización', 'cotizacion', 'precio del bitcoin', 'precio de cripto',
-        'noticias sobre', 'últimas noticias', 'ultimas noticias', 'actualidad',
-
-        # Portuguese (Includes unaccented versions for robust matching)
-        'previsão do tempo', 'previsao do tempo', 'receita para', 'receita de', 'cozinhar um', 'assar um',
-        'recomendação de filme', 'recomendacao de filme', 'qual filme', 'qual série', 'qual serie',
-        'recomendação de jogo', 'recomendacao de jogo', 'placar', 'resultado do jogo', 'quem ganhou',
-        'escreva este código', 'escreva este codigo', 'debugar isso', 'depurar isso',
-        'conserte este código', 'conserta esse codigo', 'arrumar esse', 'resolva este problema',
-        'preço da ação', 'preco da acao', 'cotação', 'cotacao', 'preço do bitcoin', 'preco do bitcoin',
-        'notícias sobre', 'noticias sobre', 'últimas notícias', 'ultimas noticias', 'atualidades'
-    ]
-
-    query_lower = query.lower()
-
-    for indicator in hard_off_topic:
-        if indicator in query_lower:
-            return True, "That's outside the scope of our conversation."
+    if query_filter.match_off_topic(query):
+        return True, "That's outside the scope of our conversation."
 
     return False, None
 
 
 async def get_embedding(text: str) -> list[float]:
-    """Generates an embedding vector for a given text using OpenAI."""
-    return await embeddings.aembed_query(text)
+    """
+    Generates an embedding vector for a given text using OpenAI.
+    Repeated questions are served from the two-tier embedding cache.
+    """
+    return await embedding_cache.get_or_compute(text, embeddings.aembed_query)
+
+
+async def _summarize_turns(previous_summary: str, messages: list[dict], language: str) -> str:
+    transcript = '\n'.join(
+        f"{'Visitor' if msg.get('role') == 'user' else 'MatIAs'}: {msg.get('content') or ''}"
+        for msg in messages
+    )
+    return await summary_chain.ainvoke({
+        'summary': previous_summary or '(none yet)',
+        'messages': transcript
+    })
+
+
+def build_history_messages(chat_history: list[dict] | None, language: str) -> list:
+    """
+    Converts client chat history to LangChain messages.
+
+    Long conversations send a running summary of the older turns (generated
+    in the background, see conversation_summary.py) plus the recent ones.
+    The verbatim part is trimmed to HISTORY_TOKEN_BUDGET.
+    """
+    if not chat_history:
+        return []
+
+    summary = None
+    if settings.CONVERSATION_SUMMARY_ENABLED:
+        summary, chat_history = conversation_summarizer.compact(
+            chat_history, language, _summarize_turns
+        )
+
+    history_messages = []
+    budget = settings.HISTORY_TOKEN_BUDGET
+    if summary:
+        history_messages.append(SystemMessage(content=f'Summary of the earlier conversation:\n{summary}'))
+        budget = max(0, budget - count_tokens(summary))
+
+    for msg in pack_history(chat_history, budget):
+        if msg.get('role') == 'user':
+            history_messages.append(HumanMessage(content=msg['content']))
+        elif msg.get('role') == 'assistant':
+            history_messages.append(AIMessage(content=msg['content']))
+    return history_messages
+
+
+# ============================================================================
+# REPLY PIPELINE (shared by the JSON and streaming endpoints)
+# ============================================================================
+
+@dataclass
+class ReplyComplete:
+    """Last item of a reply stream whose text is a real answer worth logging."""
+    text: str
+
+
+async def _generate_reply(
+    query: str,
+    language: str,
+    chat_history: list[dict] | None
+) -> AsyncGenerator[str | ReplyComplete, None]:
+    """
+    Embeds the question, retrieves context and streams the LLM answer.
+
+    Fallback messages (embedding error, off-topic, no context, LLM error) are
+    yielded as a single chunk with no ReplyComplete. Retrieval uses its own
+    short-lived session, so no pool connection is held while the LLM streams.
+    """
+
+    # ========================================================================
+    # STEP 3: Generate embedding and search for relevant context
+    # ========================================================================
+    try:
+        query_vector = await get_embedding(query)
+    except Exception as e:
+        # Fallback if embedding fails
+        print(f"❌ Embedding error: {e}")
+        yield EMBEDDING_ERROR_MESSAGES.get(language, EMBEDDING_ERROR_MESSAGES['en'])
+        return
+
+    # Questions closer to an off-topic intent than to any on-topic one skip retrieval and the LLM
+    if settings.SEMANTIC_GUARDRAIL_ENABLED and semantic_guardrail.check(language, query_vector):
+        yield OFF_TOPIC_MESSAGES.get(language, OFF_TOPIC_MESSAGES['en'])
+        return
+
+    # First-turn paraphrases of an already answered question skip retrieval and the LLM
+    use_answer_cache = settings.ANSWER_CACHE_ENABLED and not chat_history
+    corpus_version = await sync_corpus_version() if use_answer_cache else get_corpus_version()
+    cached_answer = answer_cache.lookup(language, query_vector) if use_answer_cache else None
+
+    if cached_answer is not None:
+        # Replay the cached answer as several frames so the client UX is unchanged
+        for piece in split_for_replay(cached_answer):
+            yield piece
+        yield ReplyComplete(cached_answer)
+        return
+
+    # Search ONLY for documents in the validated language (STRICT filter)
+    async with AsyncSession(engine) as db:
+        docs = await search_similar_documents(db, query_vector, language, query_text=query)
+
+    if not docs:
+        # No context found - cannot answer (ZERO HALLUCINATION)
+        yield NO_CONTEXT_MESSAGES.get(language, NO_CONTEXT_MESSAGES['en'])
+        return
+
+    context_text = pack_context(docs, settings.CONTEXT_TOKEN_BUDGET)
+
+    # ========================================================================
+    # STEP 4: Convert chat history to LangChain message format
+    # ========================================================================
+    history_messages = build_history_messages(chat_history, language)
+
+    # ========================================================================
+    # STEP 5: Stream response using RAG chain (.astream)
+    # ========================================================================
+    reply_parts: list[str] = []
+    try:
+        async for chunk in rag_chain.astream({
+            'context': context_text,
+            'question': query,
+            'chat_history': history_messages if history_messages else []
+        }):
+            reply_parts.append(chunk)
+            yield chunk
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # Every reader went away: the LLM request is cancelled with us
+        stream_metrics.record_cancelled(count_tokens(''.join(reply_parts)))
+        raise
+
+    except Exception as e:
+        print(f"❌ LLM streaming error: {e}")
+        yield LLM_ERROR_MESSAGES.get(language, LLM_ERROR_MESSAGES['en'])
+        return
+
+    full_reply = ''.join(reply_parts)
+    if not full_reply:
+        return
+
+    stream_metrics.record_completed(count_tokens(full_reply))
+
+    if use_answer_cache:
+        answer_cache.store(language, query_vector, full_reply, corpus_version)
+
+    yield ReplyComplete(full_reply)
+
+
+def _reply_stream(
+    query: str,
+    language: str,
+    chat_history: list[dict] | None
+) -> AsyncIterator[str | ReplyComplete]:
+    """
+    Runs _generate_reply, coalescing identical first-turn questions.
+
+    Concurrent requests with the same language and normalized question (and
+    no history) share one pipeline: one embedding, one search, one LLM
+    generation, fanned out to every subscriber.
+    """
+    if chat_history or not settings.REQUEST_COALESCING_ENABLED:
+        return _generate_reply(query, language, chat_history)
+
+    key = ('reply', language, normalize_query(query))
+    return request_coalescer.stream(key, lambda: _generate_reply(query, language, None))
 
 
 # ============================================================================
@@ -233,7 +408,6 @@ async def get_embedding(text: str) -> list[float]:
 async def get_digital_twin_response(
     query: str,
     language: str,
-    db: AsyncSession,
     chat_history: list[dict] | None = None
 ) -> str:
     """
@@ -242,7 +416,6 @@ async def get_digital_twin_response(
     Args:
         query: The user's question
         language: Language code ('en', 'es', 'pt')
-        db: Database session
         chat_history: Optional conversation history
 
     Returns:
@@ -274,62 +447,17 @@ async def get_digital_twin_response(
 
 
     # ========================================================================
-    # STEP 3: Generate embedding and search for relevant context
+    # STEPS 3-5: Retrieve context and generate the answer
     # ========================================================================
-    try:
-        query_vector = await get_embedding(query)
-    except Exception as e:
-        # Fallback if embedding fails
-        print(f"❌ Embedding error: {e}")
-        return EMBEDDING_ERROR_MESSAGES.get(validated_language, EMBEDDING_ERROR_MESSAGES['en'])
-
-    # Search ONLY for documents in the validated language (STRICT filter)
-    stmt = (
-        select(RagDocument)
-        .where(RagDocument.language == validated_language)
-        .where(RagDocument.active == True)
-        .order_by(RagDocument.embedding.cosine_distance(query_vector))
-        .limit(5)
-    )
-
-    result = await db.execute(stmt)
-    docs = result.scalars().all()
-
-    # Build context from retrieved documents
-    if not docs:
-        # No context found - cannot answer (ZERO HALLUCINATION)
-        return NO_CONTEXT_MESSAGES.get(validated_language, NO_CONTEXT_MESSAGES['en'])
-
-    context_text = '\n\n---\n\n'.join([doc.content for doc in docs])
-
+    reply_parts = []
+    async with aclosing(_reply_stream(query, validated_language, chat_history)) as chunks:
+        async for chunk in chunks:
+            if isinstance(chunk, ReplyComplete):
+                return chunk.text
+            reply_parts.append(chunk)
 
-    # ========================================================================
-    # STEP 4: Convert chat history to LangChain message format
-    # ========================================================================
-    history_messages = []
-    if chat_history:
-        for msg in chat_history:
-            if msg['role'] == 'user':
-                history_messages.append(HumanMessage(content=msg['content']))
-            elif msg['role'] == 'assistant':
-                history_messages.append(AIMessage(content=msg['content']))
-
-
-    # ========================================================================
-    # STEP 5: Generate response using RAG chain
-    # ========================================================================
-    try:
-        response = await rag_chain.ainvoke({
-            'context': context_text,
-            'question': query,
-            'chat_history': history_messages if history_messages else []
-        })
-        return response
-
-    except Exception as e:
-        # Graceful error handling
-        print(f"❌ LLM error: {e}")
-        return LLM_ERROR_MESSAGES.get(validated_language, LLM_ERROR_MESSAGES['en'])
+    # Fallback message
+    return ''.join(reply_parts)
 
 
 # ============================================================================
@@ -339,23 +467,24 @@ async def get_digital_twin_response(
 async def stream_digital_twin_response(
     query: str,
     language: str,
-    db: AsyncSession,
-    chat_history: list[dict] | None = None
+    chat_history: list[dict] | None = None,
+    session_id: str | None = None
 ) -> AsyncGenerator[str, None]:
     """
     Streams the digital twin response token-by-token using Server-Sent Events.
 
-    Mirrors get_digital_twin_response but uses .astream() on the RAG chain.
-    Short-circuit paths (greeting, off-topic, no context, errors) yield
-    their full message as a single chunk.
+    Mirrors get_digital_twin_response but streams the chunks as they are
+    generated. Short-circuit paths (greeting, off-topic, no context, errors)
+    yield their full message as a single chunk.
 
-    After streaming completes, the full reply is persisted to the database.
+    After streaming completes, the full reply is persisted to the database
+    in its own short transaction.
 
     Args:
         query: The user's question
         language: Language code ('en', 'es', 'pt')
-        db: Database session
         chat_history: Optional conversation history
+        session_id: Server-side chat session the turn belongs to, if any
 
     Yields:
         str chunks of the AI reply
@@ -386,77 +515,53 @@ async def stream_digital_twin_response(
         return
 
     # ========================================================================
-    # STEP 3: Generate embedding and search for relevant context
+    # STEPS 3-5: Stream the answer; STEP 6: persist it (after stream completes)
     # ========================================================================
-    try:
-        query_vector = await get_embedding(query)
-    except Exception as e:
-        print(f"❌ Embedding error: {e}")
-        yield EMBEDDING_ERROR_MESSAGES.get(validated_language, EMBEDDING_ERROR_MESSAGES['en'])
-        return
+    # aclosing: a client that disconnects releases its share of the pipeline
+    async with aclosing(_reply_stream(query, validated_language, chat_history)) as chunks:
+        async for chunk in chunks:
+            if isinstance(chunk, ReplyComplete):
+                # Coalesced requests each log their own turn
+                await save_chat_log(query, chunk.text, validated_language, session_id)
+            else:
+                yield chunk
 
-    stmt = (
-        select(RagDocument)
-        .where(RagDocument.language == validated_language)
-        .where(RagDocument.active == True)
-        .order_by(RagDocument.embedding.cosine_distance(query_vector))
-        .limit(5)
-    )
-    result = await db.execute(stmt)
-    docs = result.scalars().all()
-
-    if not docs:
-        yield NO_CONTEXT_MESSAGES.get(validated_language, NO_CONTEXT_MESSAGES['en'])
-        return
-
-    context_text = '\n\n---\n\n'.join([doc.content for doc in docs])
 
-    # ========================================================================
-    # STEP 4: Convert chat history to LangChain message format
-    # ========================================================================
-    history_messages = []
-    if chat_history:
-        for msg in chat_history:
-            if msg['role'] == 'user':
-                history_messages.append(HumanMessage(content=msg['content']))
-            elif msg['role'] == 'assistant':
-                history_messages.append(AIMessage(content=msg['content']))
-
-    # ========================================================================
-    # STEP 5: Stream response using RAG chain (.astream)
-    # ========================================================================
-    full_reply = ""
-    try:
-        async for chunk in rag_chain.astream({
-            'context': context_text,
-            'question': query,
-            'chat_history': history_messages if history_messages else []
-        }):
-            full_reply += chunk
-            yield chunk
+async def save_chat_log(
+    query: str,
+    reply: str,
+    language: str,
+    session_id: str | None = None
+) -> None:
+    """
+    Persists a conversation turn.
 
-    except Exception as e:
-        print(f"❌ LLM streaming error: {e}")
-        error_msg = LLM_ERROR_MESSAGES.get(validated_language, LLM_ERROR_MESSAGES['en'])
-        yield error_msg
+    With the write-behind writer running the row is only buffered and
+    written later in a batch; otherwise it is inserted in its own short
+    transaction. Never raises: a failed log must not fail the chat response.
+    """
+    if chat_log_writer.running:
+        chat_log_writer.enqueue(session_id, query, reply, language)
+        if session_id:
+            await chat_session_store.append_turn(session_id, query, reply)
         return
 
-    # ========================================================================
-    # STEP 6: Persist the full conversation to DB (after stream completes)
-    # ========================================================================
-    if full_reply:
-        try:
-            from app.models.chat_logs import ChatLog
-            chat_log = ChatLog(
+    try:
+        from app.models.chat_logs import ChatLog
+        async with AsyncSession(engine) as db:
+            db.add(ChatLog(
+                session_id=session_id,
                 user_message=query,
-                bot_reply=full_reply,
-                language=validated_language
-            )
-            db.add(chat_log)
+                bot_reply=reply,
+                language=language
+            ))
             await db.commit()
-        except Exception as db_error:
-            print(f"⚠️  Failed to save streaming chat log: {db_error}")
-            await db.rollback()
+    except Exception as db_error:
+        print(f"⚠️  Failed to save chat log to database: {db_error}")
+        return
+
+    if session_id:
+        await chat_session_store.append_turn(session_id, query, reply)
 
 
 # ============================================================================
@@ -478,10 +583,103 @@ def get_initial_greeting(language: str = 'en') -> str:
 # DOCUMENT PROCESSING & EMBEDDING (Background Task)
 # ============================================================================
 
-async def process_and_embed_document(file_bytes: bytes, filename: str, language: str):
+SUPPORTED_DOCUMENT_TYPES = {'.pdf', '.md', '.txt'}
+
+# Plain-text documents are handed to the splitter in segments of roughly this size
+TEXT_SEGMENT_CHARS = 16_000
+
+
+async def _iter_document_pages(buffer: BinaryIO, ext: str) -> AsyncGenerator[tuple[str, float], None]:
+    """
+    Yields a document's text one page (PDF) or segment (MD/TXT) at a time,
+    so only the page being processed is held as extracted text, together
+    with the fraction of the document read so far.
+    """
+    if ext == '.pdf':
+        reader = await asyncio.to_thread(PdfReader, buffer)
+        total_pages = len(reader.pages)
+        for page_number in range(total_pages):
+            # Extraction is CPU-bound; keep it off the event loop
+            text = await asyncio.to_thread(reader.pages[page_number].extract_text)
+            if text and text.strip():
+                yield text, (page_number + 1) / total_pages
+        return
+
+    total_bytes = buffer.seek(0, io.SEEK_END) or 1
+    buffer.seek(0)
+    stream = io.TextIOWrapper(buffer, encoding='utf-8', errors='replace')
+    segment: list[str] = []
+    segment_chars = 0
+    for line in stream:
+        segment.append(line)
+        segment_chars += len(line)
+        # Cut on a blank line so paragraphs are not split across segments
+        if segment_chars >= TEXT_SEGMENT_CHARS and not line.strip():
+            yield ''.join(segment), min(buffer.tell() / total_bytes, 1.0)
+            segment, segment_chars = [], 0
+    if segment:
+        yield ''.join(segment), 1.0
+
+
+async def _iter_document_chunks(buffer: BinaryIO, ext: str) -> AsyncGenerator[tuple[str, float], None]:
+    """Splits each page as it is read and yields its chunks with the read fraction."""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800,
+        chunk_overlap=100
+    )
+
+    async for page_text, fraction in _iter_document_pages(buffer, ext):
+        for chunk in text_splitter.split_text(page_text):
+            yield chunk, fraction
+
+
+async def _embed_and_store_batch(batch: dict[str, str], filename: str, language: str) -> None:
+    """Embeds one batch of new chunks and commits it in its own transaction."""
+    texts = list(batch.values())
+    vectors = await embed_in_batches(
+        texts,
+        embeddings.aembed_documents,
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+        concurrency=settings.EMBEDDING_CONCURRENCY,
+        max_retries=settings.EMBEDDING_MAX_RETRIES
+    )
+
+    async with AsyncSession(engine) as session:
+        await session.execute(insert(RagDocument), [
+            {
+                'source': filename, # Save the real filename, not the ugly temp name!
+                'content': text,
+                'content_hash': content_hash,
+                'token_count': count_tokens(text),
+                'language': language,
+                'embedding': vector,
+                # Derived copies only when searched: NULLs stay out of their HNSW indexes
+                'embedding_half': vector if settings.EMBEDDING_PRECISION == 'half' else None,
+                'embedding_short': shorten_embedding(vector) if settings.TWO_STAGE_RETRIEVAL else None,
+                'active': True,
+            }
+            for (content_hash, text), vector in zip(batch.items(), vectors)
+        ])
+        await session.commit()
+
+
+async def process_and_embed_document(
+    file_bytes: bytes | BinaryIO,
+    filename: str,
+    language: str,
+    on_progress: Callable[[int], Awaitable[None]] | None = None
+):
     """
     Processes a document (PDF, MD, TXT) and stores its embeddings in the database.
-    Serverless-safe: Uses a temporary file that is immediately cleaned up.
+
+    Streams the document page by page from an in-memory or spooled buffer
+    (no temp files): each page is split, only chunks not already stored for
+    this source + language are embedded, and new rows are committed every
+    INGESTION_COMMIT_BATCH_SIZE chunks, so peak memory does not grow with
+    document size. Chunks that disappeared from the document are deactivated.
+
+    on_progress, if given, is awaited with the percentage of the document
+    processed each time it advances.
     """
     print(f"🧠 Starting background processing for {filename}...")
 
@@ -493,52 +691,87 @@ async def process_and_embed_document(file_bytes: bytes, filename: str, language:
         validated_language = 'en'
 
     ext = os.path.splitext(filename)[1].lower()
+    if ext not in SUPPORTED_DOCUMENT_TYPES:
+        print(f"❌ Unsupported file type: {ext}")
+        return
 
-    # 2. NEW: Create a secure, temporary file just for LangChain to read
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-        temp_file.write(file_bytes)
-        temp_filepath = temp_file.name
+    buffer = io.BytesIO(file_bytes) if isinstance(file_bytes, (bytes, bytearray)) else file_bytes
 
-    try:
-        # Select appropriate loader based on file type using the TEMP file path
-        if ext == ".pdf":
-            loader = PyPDFLoader(temp_filepath)
-        elif ext in [".md", ".txt"]:
-            loader = TextLoader(temp_filepath, encoding="utf-8")
-        else:
-            print(f"❌ Unsupported file type: {ext}")
-            return
-
-        # Push the heavy synchronous file reading to a background thread
-        docs = await asyncio.to_thread(loader.load)
-
-        # Configure text splitter for optimal chunk size
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,
-            chunk_overlap=100
+    # What is already stored for this source + language, by content hash.
+    # Older re-uploads may have left several rows with the same hash.
+    async with AsyncSession(engine) as session:
+        result = await session.execute(
+            select(RagDocument.id, RagDocument.content_hash, RagDocument.active)
+            .where(RagDocument.source == filename)
+            .where(RagDocument.language == validated_language)
+            .order_by(RagDocument.id)
         )
-
-        # Push the heavy text splitting to a background thread as well
-        chunks = await asyncio.to_thread(text_splitter.split_documents, docs)
-
-        # Connect to the database and save the vectors
+        existing: dict[str, list] = {}
+        for row in result.all():
+            existing.setdefault(row.content_hash, []).append(row)
+
+    seen_hashes: set[str] = set()
+    pending: dict[str, str] = {}
+    added = 0
+    reported_percent = 0
+
+    async for chunk, fraction in _iter_document_chunks(buffer, ext):
+        content_hash = compute_content_hash(chunk)
+        # A chunk repeated in the same file is stored once
+        if content_hash in seen_hashes:
+            continue
+        seen_hashes.add(content_hash)
+
+        if content_hash not in existing:
+            pending[content_hash] = chunk
+
+        if len(pending) >= settings.INGESTION_COMMIT_BATCH_SIZE:
+            await _embed_and_store_batch(pending, filename, validated_language)
+            added += len(pending)
+            pending = {}
+
+        # Report only while nothing is pending, so progress never runs ahead of stored rows
+        if on_progress and not pending and int(fraction * 100) > reported_percent:
+            reported_percent = int(fraction * 100)
+            await on_progress(reported_percent)
+
+    if pending:
+        await _embed_and_store_batch(pending, filename, validated_language)
+        added += len(pending)
+
+    # Exactly one active row per hash still in the file (preferring one that
+    # is already active); every other row for this source is deactivated
+    stale_ids, revived_ids = [], []
+    for content_hash, rows in existing.items():
+        keep = None
+        if content_hash in seen_hashes:
+            keep = next((row for row in rows if row.active), rows[0])
+            if not keep.active:
+                revived_ids.append(keep.id)
+        stale_ids += [row.id for row in rows if row.active and row is not keep]
+
+    if stale_ids or revived_ids:
         async with AsyncSession(engine) as session:
-            for chunk in chunks:
-                vector = await embeddings.aembed_query(chunk.page_content)
-
-                new_doc = RagDocument(
-                    source=filename, # Save the real filename, not the ugly temp name!
-                    content=chunk.page_content,
-                    language=validated_language,
-                    embedding=vector,
-                    active=True
+            if stale_ids:
+                await session.execute(
+                    update(RagDocument).where(RagDocument.id.in_(stale_ids)).values(active=False)
+                )
+            if revived_ids:
+                await session.execute(
+                    update(RagDocument).where(RagDocument.id.in_(revived_ids)).values(active=True)
                 )
-                session.add(new_doc)
-
             await session.commit()
-            print(f"✅ Background processing complete! {len(chunks)} vectors added to Neon for language '{validated_language}'.")
 
-    finally:
-        # 3. CRITICAL: Always delete the temp file, even if the AI crashes!
-        if os.path.exists(temp_filepath):
-            os.remove(temp_filepath)
+    if not (added or stale_ids or revived_ids):
+        print(f"✅ {filename} is unchanged for language '{validated_language}'. Nothing to embed.")
+        return
+
+    bump_corpus_version()
+    print(
+        f"✅ Background processing complete! {added} vectors added, {len(revived_ids)} reactivated "
+        f"and {len(stale_ids)} deactivated in Neon for language '{validated_language}'."
+    )
+
+    if settings.VECTOR_INDEX_ENABLED:
+        # (De)activated rows leave gaps an append cannot fill: rebuild instead
+        await vector_index.refresh(validated_language, rebuild=bool(stale_ids or revived_ids))
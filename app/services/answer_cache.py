@@ -0,0 +1,200 @@
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import chain
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.core.settings import settings
+from app.models.rag_documents import RagDocument
+
+
+# ============================================================================
+# CORPUS VERSION
+# ============================================================================
+
+_corpus_version = 0
+
+# Fingerprint of the active rag_documents rows, shared by every process
+_db_fingerprint: tuple | None = None
+_fingerprint_checked_at = 0.0
+_fingerprint_lock = asyncio.Lock()
+
+
+def get_corpus_version() -> int:
+    return _corpus_version
+
+
+async def sync_corpus_version() -> int:
+    """
+    Returns the corpus version after checking, at most every
+    ANSWER_CACHE_VERSION_CHECK_SECONDS, whether rag_documents changed in the
+    database. Catches ingestion done by other web workers or by the
+    standalone ingestion worker, whose bump_corpus_version() calls never
+    reach this process.
+
+    The fingerprint is (count, max id, sum of ids, newest updated_at) of the
+    active rows, so inserts, deactivations, reactivations and edits all
+    change it.
+    """
+    global _db_fingerprint, _fingerprint_checked_at
+
+    if time.monotonic() - _fingerprint_checked_at < settings.ANSWER_CACHE_VERSION_CHECK_SECONDS:
+        return _corpus_version
+
+    async with _fingerprint_lock:
+        # Another request may have checked while we waited for the lock
+        if time.monotonic() - _fingerprint_checked_at < settings.ANSWER_CACHE_VERSION_CHECK_SECONDS:
+            return _corpus_version
+        _fingerprint_checked_at = time.monotonic()
+
+        try:
+            async with AsyncSession(engine) as session:
+                result = await session.execute(
+                    select(
+                        func.count(),
+                        func.max(RagDocument.id),
+                        func.sum(RagDocument.id),
+                        func.max(RagDocument.updated_at),
+                    )
+                    .where(RagDocument.active == True)
+                )
+                fingerprint = tuple(result.one())
+        except Exception as e:
+            print(f"⚠️  Failed to check the RAG corpus version: {e}")
+            return _corpus_version
+
+        if _db_fingerprint is not None and fingerprint != _db_fingerprint:
+            bump_corpus_version()
+        _db_fingerprint = fingerprint
+
+    return _corpus_version
+
+
+def bump_corpus_version() -> None:
+    """Marks every cached answer as stale. Call after bulk RagDocument writes."""
+    global _corpus_version
+    _corpus_version += 1
+    answer_cache.clear()
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_rag_document_change(session, flush_context):
+    # Catches ORM writes (admin edits, deletes); Core bulk inserts must bump explicitly
+    if any(isinstance(obj, RagDocument) for obj in chain(session.new, session.dirty, session.deleted)):
+        bump_corpus_version()
+
+
+# ============================================================================
+# SEMANTIC ANSWER CACHE
+# ============================================================================
+
+@dataclass
+class CachedAnswer:
+    vector: np.ndarray
+    answer: str
+    corpus_version: int
+    expires_at: float
+
+
+class SemanticAnswerCache:
+    """
+    First-turn answers keyed by query embedding, per language.
+
+    A new question whose embedding is within `similarity` (cosine) of a
+    cached one is answered from memory, skipping retrieval and the LLM.
+    """
+
+    def __init__(self, similarity: float, max_entries: int, ttl_seconds: int):
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, list[CachedAnswer]] = defaultdict(list)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def lookup(self, language: str, query_vector) -> str | None:
+        now = time.monotonic()
+        version = get_corpus_version()
+        entries = [
+            entry for entry in self._entries.get(language, [])
+            if entry.expires_at > now and entry.corpus_version == version
+        ]
+        self._entries[language] = entries
+
+        if not entries:
+            self.misses += 1
+            return None
+
+        query = self._normalize(query_vector)
+        scores = np.vstack([entry.vector for entry in entries]) @ query
+        best = int(np.argmax(scores))
+
+        if scores[best] < self.similarity:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entries[best].answer
+
+    def store(self, language: str, query_vector, answer: str, corpus_version: int) -> None:
+        """
+        Caches an answer generated against `corpus_version`. Answers whose
+        corpus changed while they were being generated are discarded.
+        """
+        if corpus_version != get_corpus_version():
+            return
+
+        entries = self._entries[language]
+        entries.append(CachedAnswer(
+            vector=self._normalize(query_vector),
+            answer=answer,
+            corpus_version=corpus_version,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        ))
+        if len(entries) > self.max_entries:
+            del entries[:len(entries) - self.max_entries]
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': sum(len(entries) for entries in self._entries.values()),
+            'corpus_version': get_corpus_version(),
+        }
+
+
+def split_for_replay(answer: str, chunk_size: int = 48) -> list[str]:
+    """Splits a cached answer on word boundaries so it can be replayed as SSE frames."""
+    chunks, current = [], ''
+    for word in answer.split(' '):
+        candidate = f'{current} {word}' if current else word
+        if len(candidate) > chunk_size and current:
+            chunks.append(current + ' ')
+            current = word
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+answer_cache = SemanticAnswerCache(
+    similarity=settings.ANSWER_CACHE_SIMILARITY,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+)
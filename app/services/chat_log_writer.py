@@ -0,0 +1,121 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine
+from app.core.settings import settings
+from app.models.chat_logs import ChatLog
+
+
+class ChatLogWriter:
+    """
+    Write-behind buffer for ChatLog rows.
+
+    Requests only append a record to an in-memory buffer; a background task
+    writes the buffer with one multi-row INSERT every `batch_size` records
+    or `flush_seconds`, whichever comes first. The buffer holds at most
+    `max_pending` records: beyond that new records are dropped (and
+    counted) rather than letting a slow database grow memory without bound.
+
+    Records still buffered when the process stops are flushed by stop();
+    a crash loses at most one buffer's worth of logs.
+    """
+
+    def __init__(self, batch_size: int, flush_seconds: float, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._pending: deque[dict] = deque()
+        self._batch_ready = asyncio.Event()
+        self._loop_task: asyncio.Task | None = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._loop_task is not None
+
+    def enqueue(self, session_id: str | None, user_message: str, bot_reply: str, language: str) -> bool:
+        """Buffers one turn. Returns False if it was dropped because the buffer is full."""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+
+        self._pending.append({
+            'session_id': session_id,
+            'user_message': user_message,
+            'bot_reply': bot_reply,
+            'language': language,
+            # Stamped now, not at flush time (chat_logs.created_at is naive UTC)
+            'created_at': datetime.now(timezone.utc).replace(tzinfo=None),
+        })
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+        return True
+
+    def start(self) -> None:
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the flush loop and writes everything still buffered."""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+        while self._pending:
+            await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+
+            while self._pending:
+                await self.flush()
+                if len(self._pending) < self.batch_size:
+                    break
+
+    async def flush(self) -> None:
+        """Writes up to `batch_size` buffered records in one INSERT."""
+        rows = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+        if not rows:
+            return
+
+        try:
+            async with AsyncSession(engine) as db:
+                await db.execute(insert(ChatLog), rows)
+                await db.commit()
+        except Exception as e:
+            self.failed += len(rows)
+            print(f"⚠️  Failed to write {len(rows)} chat logs: {e}")
+            return
+
+        self.written += len(rows)
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            'running': self.running,
+            'pending': len(self._pending),
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+
+chat_log_writer = ChatLogWriter(
+    batch_size=settings.CHAT_LOG_BATCH_SIZE,
+    flush_seconds=settings.CHAT_LOG_FLUSH_MS / 1000,
+    max_pending=settings.CHAT_LOG_MAX_PENDING,
+)
@@ -0,0 +1,149 @@
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine
+from app.core.settings import settings
+from app.models.chat_logs import ChatLog
+from app.models.chat_sessions import ChatSession
+
+
+@dataclass
+class CachedSession:
+    language: str
+    messages: list[dict] = field(default_factory=list)
+    last_active: float = field(default_factory=time.monotonic)
+
+
+class ChatSessionStore:
+    """
+    Server-side conversation state for clients that opt into sessions.
+
+    Turns live in chat_logs (linked by session_id); the most recently used
+    sessions are also kept in an in-process LRU so a follow-up message does
+    not reload its history. Sessions idle for longer than `idle_seconds` are
+    expired, both in memory and when reloaded from the database.
+
+    The LRU is per process: with several workers, route a session to the
+    same worker (or accept that a follow-up served elsewhere reloads it).
+    """
+
+    def __init__(self, max_entries: int, idle_seconds: int, max_messages: int):
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self.max_messages = max_messages
+        self._sessions: OrderedDict[str, CachedSession] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _put(self, session_id: str, session: CachedSession) -> None:
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    def _expire_idle(self) -> None:
+        # Least recently used first, so stop at the first live session
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_active >= cutoff:
+                break
+            del self._sessions[session_id]
+
+    async def create(self, language: str) -> str:
+        session_id = uuid.uuid4().hex
+        async with AsyncSession(engine) as db:
+            db.add(ChatSession(id=session_id, language=language))
+            await db.commit()
+
+        self._put(session_id, CachedSession(language=language))
+        return session_id
+
+    async def get_history(self, session_id: str) -> list[dict] | None:
+        """
+        Returns the stored turns of a session as chat_history messages,
+        oldest first, or None if the session does not exist or has expired.
+        """
+        self._expire_idle()
+
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self.hits += 1
+            session.last_active = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return list(session.messages)
+
+        self.misses += 1
+        idle_before = func.now() - timedelta(seconds=self.idle_seconds)
+        async with AsyncSession(engine) as db:
+            record = await db.scalar(
+                select(ChatSession)
+                .where(ChatSession.id == session_id)
+                .where(ChatSession.last_active_at > idle_before)
+            )
+            if record is None:
+                return None
+
+            result = await db.execute(
+                select(ChatLog.user_message, ChatLog.bot_reply)
+                .where(ChatLog.session_id == session_id)
+                .order_by(ChatLog.id.desc())
+                .limit(self.max_messages // 2)
+            )
+            turns = list(reversed(result.all()))
+
+        session = CachedSession(language=record.language)
+        for user_message, bot_reply in turns:
+            session.messages += [
+                {'role': 'user', 'content': user_message},
+                {'role': 'assistant', 'content': bot_reply},
+            ]
+        self._put(session_id, session)
+        return list(session.messages)
+
+    async def append_turn(self, session_id: str, query: str, reply: str) -> None:
+        """
+        Records a turn whose ChatLog row was saved (or buffered by the
+        chat log writer) with this session_id.
+        Only the last `max_messages` messages are kept for the prompt.
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.messages += [
+                {'role': 'user', 'content': query},
+                {'role': 'assistant', 'content': reply},
+            ]
+            del session.messages[:-self.max_messages]
+            session.last_active = time.monotonic()
+            self._sessions.move_to_end(session_id)
+
+        try:
+            async with AsyncSession(engine) as db:
+                await db.execute(
+                    update(ChatSession)
+                    .where(ChatSession.id == session_id)
+                    .values(last_active_at=func.now())
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"⚠️  Failed to touch chat session {session_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._sessions),
+        }
+
+
+chat_session_store = ChatSessionStore(
+    max_entries=settings.CHAT_SESSION_CACHE_SIZE,
+    idle_seconds=settings.CHAT_SESSION_IDLE_SECONDS,
+    max_messages=settings.CHAT_SESSION_MAX_MESSAGES,
+)
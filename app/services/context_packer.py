@@ -0,0 +1,97 @@
+from functools import lru_cache
+
+import tiktoken
+
+from app.services.retrieval_service import RetrievedChunk
+
+
+CONTEXT_SEPARATOR = '\n\n---\n\n'
+
+
+# ============================================================================
+# TOKEN COUNTING
+# ============================================================================
+
+@lru_cache(maxsize=1)
+def _encoding() -> tiktoken.Encoding | None:
+    try:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        # The BPE file is fetched on first use; fall back to an estimate if that fails
+        print(f"⚠️  tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with cl100k_base. The chat models use other tokenizers,
+    so this is a budget estimate rather than an exact prompt size.
+    """
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+# ============================================================================
+# PACKING
+# ============================================================================
+
+def pack_context(chunks: list[RetrievedChunk], budget: int) -> str:
+    """
+    Joins the highest-ranked chunks that fit in `budget` tokens.
+
+    Chunks arrive most relevant first. A chunk that does not fit is skipped
+    so smaller, lower-ranked ones can still use the remaining budget; if not
+    even the top chunk fits, it is truncated rather than sending no context.
+    """
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+    packed: list[str] = []
+    used = 0
+
+    for chunk in chunks:
+        tokens = chunk.token_count or count_tokens(chunk.content)
+        cost = tokens + (separator_tokens if packed else 0)
+        if used + cost <= budget:
+            packed.append(chunk.content)
+            used += cost
+
+    if not packed and chunks:
+        packed.append(truncate_to_tokens(chunks[0].content, budget))
+
+    return CONTEXT_SEPARATOR.join(packed)
+
+
+def pack_history(chat_history: list[dict], budget: int) -> list[dict]:
+    """
+    Keeps the most recent turns that fit in `budget` tokens, oldest first.
+
+    Walks backwards from the latest message and stops at the first one that
+    does not fit, so the kept history is always a contiguous suffix. The
+    latest message is truncated if it alone exceeds the budget.
+    """
+    packed: list[dict] = []
+    used = 0
+
+    for message in reversed(chat_history):
+        content = message.get('content') or ''
+        tokens = count_tokens(content)
+
+        if used + tokens > budget:
+            if not packed and budget > 0:
+                packed.append({**message, 'content': truncate_to_tokens(content, budget)})
+            break
+
+        packed.append(message)
+        used += tokens
+
+    packed.reverse()
+    return packed
@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from app.core.settings import settings
+
+
+# Older turns are folded in blocks of this many messages, so a new summary
+# is generated every second exchange rather than on every request
+FOLD_STEP = 4
+
+# (previous summary or '', messages to fold in, language) -> updated summary
+Summarize = Callable[[str, list[dict], str], Awaitable[str]]
+
+
+def _prefix_keys(chat_history: list[dict], language: str) -> list[str]:
+    """keys[i] identifies chat_history[:i]; computed with one rolling hash."""
+    digest = hashlib.sha256(language.encode('utf-8'))
+    keys = [digest.hexdigest()]
+    for message in chat_history:
+        digest.update(b'\x1e' + str(message.get('role')).encode('utf-8'))
+        digest.update(b'\x1f' + str(message.get('content') or '').encode('utf-8'))
+        keys.append(digest.hexdigest())
+    return keys
+
+
+class ConversationSummarizer:
+    """
+    Running summaries of the older part of long conversations.
+
+    Clients resend the full history on every turn. Once it passes
+    `trigger_messages`, everything except the last `keep_messages` is
+    represented by a summary instead. Summaries are keyed by a hash of the
+    history prefix they cover and generated in the background, so a request
+    never waits on the summarizer: it uses the longest prefix already
+    summarized and sends the turns after it verbatim.
+    """
+
+    def __init__(self, trigger_messages: int, keep_messages: int, max_entries: int):
+        self.trigger_messages = trigger_messages
+        self.keep_messages = keep_messages
+        self.max_entries = max_entries
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        self._pending: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: str) -> str | None:
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    def _put(self, key: str, summary: str) -> None:
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.max_entries:
+            self._summaries.popitem(last=False)
+
+    def compact(
+        self,
+        chat_history: list[dict],
+        language: str,
+        summarize: Summarize
+    ) -> tuple[str | None, list[dict]]:
+        """
+        Splits history into a summary of older turns and the turns to send verbatim.
+
+        Args:
+            chat_history: Full client history, oldest first
+            language: Conversation language, part of the cache key
+            summarize: Coroutine that folds messages into a previous summary
+
+        Returns:
+            (summary or None, remaining messages)
+        """
+        if len(chat_history) <= self.trigger_messages:
+            return None, chat_history
+
+        # Align the fold point so consecutive requests share the same target
+        fold_at = (len(chat_history) - self.keep_messages) // FOLD_STEP * FOLD_STEP
+        if fold_at <= 0:
+            return None, chat_history
+        keys = _prefix_keys(chat_history[:fold_at], language)
+
+        summary = self._get(keys[fold_at])
+        if summary is not None:
+            self.hits += 1
+            return summary, chat_history[fold_at:]
+
+        self.misses += 1
+        covered, summary = 0, None
+        for end in range(fold_at - FOLD_STEP, 0, -FOLD_STEP):
+            summary = self._get(keys[end])
+            if summary is not None:
+                covered = end
+                break
+
+        self._schedule(keys[fold_at], summary or '', chat_history[covered:fold_at], language, summarize)
+        return summary, chat_history[covered:]
+
+    def _schedule(
+        self,
+        key: str,
+        previous: str,
+        messages: list[dict],
+        language: str,
+        summarize: Summarize
+    ) -> None:
+        if key in self._pending:
+            return
+        self._pending.add(key)
+
+        async def run() -> None:
+            try:
+                summary = (await summarize(previous, messages, language)).strip()
+                if summary:
+                    self._put(key, summary)
+            except Exception as e:
+                print(f"⚠️  Conversation summary failed: {e}")
+            finally:
+                self._pending.discard(key)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._summaries),
+            'pending': len(self._pending),
+        }
+
+
+conversation_summarizer = ConversationSummarizer(
+    trigger_messages=settings.CONVERSATION_SUMMARY_TRIGGER_MESSAGES,
+    keep_messages=settings.CONVERSATION_SUMMARY_KEEP_MESSAGES,
+    max_entries=settings.CONVERSATION_SUMMARY_MAX_ENTRIES,
+)
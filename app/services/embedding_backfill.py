@@ -0,0 +1,66 @@
+import asyncio
+
+from sqlalchemy import cast, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pgvector.sqlalchemy import HALFVEC, VECTOR
+
+from app.core.database import engine
+from app.core.settings import settings
+from app.models.rag_documents import SHORT_EMBEDDING_DIM, RagDocument
+
+
+async def backfill_derived_embeddings(
+    half: bool = settings.EMBEDDING_PRECISION == 'half',
+    short: bool = settings.TWO_STAGE_RETRIEVAL,
+    batch_size: int = 500
+) -> int:
+    """
+    Fills embedding_half and/or embedding_short from embedding for rows
+    that lack them. By default only the columns the current settings
+    search are filled; ingestion leaves the others NULL, so they cost no
+    storage and no HNSW maintenance.
+
+    The casts run in Postgres, so no vector crosses the wire, and each batch
+    commits on its own to keep locks short. Safe to re-run or interrupt.
+
+    Returns:
+        Number of rows updated
+    """
+    derived = {}
+    if half:
+        derived[RagDocument.embedding_half] = cast(RagDocument.embedding, HALFVEC(1536))
+    if short:
+        short_vector = func.l2_normalize(func.subvector(RagDocument.embedding, 1, SHORT_EMBEDDING_DIM))
+        derived[RagDocument.embedding_short] = cast(short_vector, VECTOR(SHORT_EMBEDDING_DIM))
+    if not derived:
+        return 0
+
+    total = 0
+    while True:
+        async with AsyncSession(engine) as session:
+            pending = (
+                select(RagDocument.id)
+                .where(or_(*(column.is_(None) for column in derived)))
+                .order_by(RagDocument.id)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                update(RagDocument)
+                .where(RagDocument.id.in_(pending))
+                .values({column.key: expression for column, expression in derived.items()})
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+        if not result.rowcount:
+            return total
+
+        total += result.rowcount
+        print(f"🔁 Backfilled derived embeddings for {total} chunks")
+
+
+if __name__ == '__main__':
+    updated = asyncio.run(backfill_derived_embeddings())
+    print(f"✅ Embedding backfill done ({updated} rows)")
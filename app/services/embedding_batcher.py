@@ -0,0 +1,96 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable
+
+import openai
+
+
+EmbedDocuments = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+class RateLimitBackoff:
+    """
+    Shared cool-down for every batch of one ingestion run.
+
+    When the provider answers 429, all in-flight workers pause until the
+    cool-down expires instead of each hammering the API on its own schedule.
+    The delay doubles on consecutive rate limits and resets after a success.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._delay = base_delay
+        self._resume_at = 0.0
+
+    async def wait(self) -> None:
+        remaining = self._resume_at - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    def penalize(self, retry_after: float | None = None) -> None:
+        delay = retry_after if retry_after else self._delay
+        # Jitter so paused workers do not all resume on the same tick
+        delay = min(self.max_delay, delay) * random.uniform(1.0, 1.25)
+        self._resume_at = max(self._resume_at, time.monotonic() + delay)
+        self._delay = min(self.max_delay, self._delay * 2)
+
+    def reward(self) -> None:
+        self._delay = self.base_delay
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return isinstance(error, openai.RateLimitError) or getattr(error, 'status_code', None) == 429
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+async def embed_in_batches(
+    texts: list[str],
+    embed_documents: EmbedDocuments,
+    batch_size: int = 64,
+    concurrency: int = 4,
+    max_retries: int = 5
+) -> list[list[float]]:
+    """
+    Embeds texts with one provider call per batch, running up to
+    `concurrency` batches at a time.
+
+    Args:
+        texts: Chunks to embed
+        embed_documents: Batch embedding coroutine (e.g. embeddings.aembed_documents)
+        batch_size: Texts per provider call
+        concurrency: Max batches in flight
+        max_retries: Rate-limit retries per batch before giving up
+
+    Returns:
+        One vector per text, in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    backoff = RateLimitBackoff()
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    async def run_batch(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                await backoff.wait()
+                try:
+                    vectors = await embed_documents(batch)
+                    backoff.reward()
+                    return vectors
+                except Exception as e:
+                    if not _is_rate_limit(e) or attempt == max_retries:
+                        raise
+                    print(f"⏳ Embedding rate limited, backing off (attempt {attempt + 1}/{max_retries})")
+                    backoff.penalize(_retry_after(e))
+
+    results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+    return [vector for batch_vectors in results for vector in batch_vectors]
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine
+from app.core.settings import settings
+from app.models.embedding_cache import EmbeddingCacheEntry
+
+
+# How often each process deletes expired rows from the embedding_cache table
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+def normalize_query(text: str) -> str:
+    """Case-folds and collapses whitespace so trivial variants share a key."""
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for query embeddings.
+
+    Tier 1 is an in-process LRU bounded by size and TTL. Tier 2 is the
+    embedding_cache table, shared by every worker; embeddings are
+    deterministic per model, so persisted rows never go stale, but rows
+    not read for `persistent_ttl_seconds` are pruned so the table does not
+    grow with every distinct question ever asked.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_entries: int,
+        ttl_seconds: int,
+        persistent: bool,
+        persistent_ttl_seconds: int
+    ):
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self.persistent_ttl_seconds = persistent_ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+        self._background_tasks: set[asyncio.Task] = set()
+        self._pruned_at = 0.0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.pruned = 0
+
+    def _key(self, normalized: str) -> str:
+        return hashlib.sha256(f'{self.model}\x00{normalized}'.encode('utf-8')).hexdigest()
+
+    # ---- Tier 1: in-process LRU ----
+
+    def _get_local(self, key: str) -> list[float] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, vector = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return vector
+
+    def _put_local(self, key: str, vector: list[float]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ---- Tier 2: Postgres ----
+
+    async def _get_persistent(self, key: str) -> list[float] | None:
+        async with AsyncSession(engine) as session:
+            # Reading a row keeps it alive: one round trip for lookup and touch
+            vector = await session.scalar(
+                update(EmbeddingCacheEntry)
+                .where(EmbeddingCacheEntry.cache_key == key)
+                .values(last_used_at=func.now())
+                .returning(EmbeddingCacheEntry.embedding)
+            )
+            await session.commit()
+        return None if vector is None else [float(value) for value in vector]
+
+    async def _put_persistent(self, key: str, normalized: str, vector: list[float]) -> None:
+        try:
+            async with AsyncSession(engine) as session:
+                await session.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(cache_key=key, model=self.model, query_text=normalized, embedding=vector)
+                    .on_conflict_do_nothing(index_elements=['cache_key'])
+                )
+                await session.commit()
+        except Exception as e:
+            print(f"⚠️  Failed to persist embedding cache entry: {e}")
+
+    async def prune(self) -> int:
+        """Deletes persisted rows not used for `persistent_ttl_seconds`. Returns how many."""
+        async with AsyncSession(engine) as session:
+            result = await session.execute(
+                delete(EmbeddingCacheEntry).where(
+                    EmbeddingCacheEntry.last_used_at
+                    < func.now() - timedelta(seconds=self.persistent_ttl_seconds)
+                )
+            )
+            await session.commit()
+
+        self.pruned += result.rowcount
+        return result.rowcount
+
+    async def _background_prune(self) -> None:
+        try:
+            deleted = await self.prune()
+        except Exception as e:
+            print(f"⚠️  Failed to prune the embedding cache: {e}")
+            return
+        if deleted:
+            print(f"🧹 Pruned {deleted} unused embedding cache entries.")
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    # ---- Public API ----
+
+    async def get_or_compute(
+        self,
+        text: str,
+        compute: Callable[[str], Awaitable[list[float]]]
+    ) -> list[float]:
+        """
+        Returns the cached embedding for text, calling compute(text) on a miss.
+
+        Failures of the persistent tier are logged and treated as misses, so
+        the cache can never make embedding unavailable.
+        """
+        normalized = normalize_query(text)
+        key = self._key(normalized)
+
+        vector = self._get_local(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector
+
+        if self.persistent:
+            try:
+                vector = await self._get_persistent(key)
+            except Exception as e:
+                print(f"⚠️  Embedding cache lookup failed: {e}")
+
+            if vector is not None:
+                self.db_hits += 1
+                self._put_local(key, vector)
+                return vector
+
+        self.misses += 1
+        vector = await compute(text)
+        self._put_local(key, vector)
+
+        if self.persistent:
+            # Write-through (and the occasional prune) happens off the request path
+            self._spawn(self._put_persistent(key, normalized, vector))
+            if time.monotonic() - self._pruned_at >= PRUNE_INTERVAL_SECONDS:
+                self._pruned_at = time.monotonic()
+                self._spawn(self._background_prune())
+
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'db_hits': self.db_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.db_hits) / lookups, 3) if lookups else 0.0,
+            'entries': len(self._entries),
+            'pruned': self.pruned,
+        }
+
+
+embedding_cache = EmbeddingCache(
+    model=settings.EMBEDDING_MODEL,
+    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+    persistent=settings.EMBEDDING_CACHE_PERSISTENT,
+    persistent_ttl_seconds=settings.EMBEDDING_CACHE_PERSISTENT_TTL_SECONDS,
+)
@@ -0,0 +1,224 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine
+from app.core.settings import settings
+from app.models.ingestion_jobs import IngestionJob
+from app.services.ai_service import process_and_embed_document
+from app.services.storage_service import download_file_from_r2
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    filename: str
+    file_key: str
+    language: str
+    attempts: int
+
+
+# ============================================================================
+# QUEUE OPERATIONS
+# ============================================================================
+
+async def enqueue_ingestion_job(filename: str, file_key: str, language: str) -> int:
+    """Persists a new ingestion job and wakes the in-process worker."""
+    async with AsyncSession(engine) as session:
+        job = IngestionJob(filename=filename, file_key=file_key, language=language)
+        session.add(job)
+        await session.commit()
+        job_id = job.id
+
+    ingestion_worker.wake()
+    return job_id
+
+
+async def _claim_next_job() -> ClaimedJob | None:
+    """
+    Claims one due job with SELECT ... FOR UPDATE SKIP LOCKED, so any number
+    of workers (in-app or standalone) can poll the same table safely.
+
+    Running jobs whose heartbeat went stale (their worker died) are claimed
+    again, unless they already used INGESTION_JOB_MAX_ATTEMPTS: a job that
+    keeps killing its worker (e.g. out of memory) is marked failed instead.
+    """
+    stale_before = func.now() - timedelta(seconds=settings.INGESTION_JOB_STALE_SECONDS)
+
+    async with AsyncSession(engine) as session:
+        async with session.begin():
+            while True:
+                job = await session.scalar(
+                    select(IngestionJob)
+                    .where(or_(
+                        (IngestionJob.status == 'pending') & (IngestionJob.run_after <= func.now()),
+                        (IngestionJob.status == 'running') & (IngestionJob.heartbeat_at < stale_before),
+                    ))
+                    .order_by(IngestionJob.run_after, IngestionJob.id)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                )
+                if job is None:
+                    return None
+
+                if job.status == 'running' and job.attempts >= settings.INGESTION_JOB_MAX_ATTEMPTS:
+                    job.status = 'failed'
+                    job.last_error = 'Worker stopped responding while processing the job'
+                    print(f"❌ Ingestion job {job.id} failed: worker died on its last attempt")
+                    await session.flush()
+                    continue
+                break
+
+            job.status = 'running'
+            job.attempts += 1
+            job.heartbeat_at = func.now()
+            claimed = ClaimedJob(job.id, job.filename, job.file_key, job.language, job.attempts)
+
+    return claimed
+
+
+async def _update_job(job_id: int, **values) -> None:
+    async with AsyncSession(engine) as session:
+        await session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id)
+            .values(heartbeat_at=func.now(), **values)
+        )
+        await session.commit()
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+class IngestionWorker:
+    """
+    Polls ingestion_jobs and runs at most `concurrency` jobs at a time.
+
+    Failed jobs are retried with exponential backoff until
+    INGESTION_JOB_MAX_ATTEMPTS is reached, then marked as failed.
+    """
+
+    def __init__(self, concurrency: int, poll_seconds: float):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self._wake_event = asyncio.Event()
+        self._loop_task: asyncio.Task | None = None
+        self._job_tasks: set[asyncio.Task] = set()
+
+    def wake(self) -> None:
+        self._wake_event.set()
+
+    def start(self) -> None:
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._loop_task, *self._job_tasks) if task]
+        for task in tasks:
+            task.cancel()
+        # Interrupted jobs keep status 'running' and are reclaimed once their heartbeat goes stale
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    async def _run(self) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        while True:
+            await semaphore.acquire()
+            try:
+                job = await _claim_next_job()
+            except Exception as e:
+                print(f"⚠️  Failed to claim ingestion job: {e}")
+                job = None
+
+            if job is None:
+                semaphore.release()
+                self._wake_event.clear()
+                try:
+                    await asyncio.wait_for(self._wake_event.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._process(job))
+            self._job_tasks.add(task)
+            task.add_done_callback(self._job_tasks.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+
+    async def _process(self, job: ClaimedJob) -> None:
+        print(f"📥 Ingestion job {job.id} started ({job.filename}, attempt {job.attempts})")
+
+        async def report_progress(percent: int) -> None:
+            await _update_job(job.id, progress=percent)
+
+        async def heartbeat() -> None:
+            # Keeps the claim alive during long stretches without progress updates
+            while True:
+                await asyncio.sleep(settings.INGESTION_JOB_STALE_SECONDS / 3)
+                try:
+                    await _update_job(job.id)
+                except Exception as e:
+                    print(f"⚠️  Ingestion job {job.id} heartbeat failed: {e}")
+
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            buffer = await download_file_from_r2(job.file_key)
+            with buffer:
+                await process_and_embed_document(
+                    file_bytes=buffer,
+                    filename=job.filename,
+                    language=job.language,
+                    on_progress=report_progress
+                )
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            print(f"❌ Ingestion job {job.id} failed: {e}")
+            try:
+                if job.attempts >= settings.INGESTION_JOB_MAX_ATTEMPTS:
+                    await _update_job(job.id, status='failed', last_error=str(e))
+                else:
+                    delay = settings.INGESTION_JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+                    await _update_job(
+                        job.id,
+                        status='pending',
+                        last_error=str(e),
+                        run_after=func.now() + timedelta(seconds=delay)
+                    )
+            except Exception as db_error:
+                print(f"⚠️  Failed to record ingestion job {job.id} failure: {db_error}")
+            return
+
+        finally:
+            heartbeat_task.cancel()
+
+        try:
+            await _update_job(job.id, status='done', progress=100, last_error=None)
+            print(f"✅ Ingestion job {job.id} done")
+        except Exception as db_error:
+            print(f"⚠️  Failed to mark ingestion job {job.id} as done: {db_error}")
+
+
+ingestion_worker = IngestionWorker(
+    concurrency=settings.INGESTION_WORKER_CONCURRENCY,
+    poll_seconds=settings.INGESTION_WORKER_POLL_SECONDS,
+)
+
+
+async def _run_standalone() -> None:
+    """Runs the worker outside the web process: python -m app.services.ingestion_worker"""
+    ingestion_worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await ingestion_worker.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(_run_standalone())
@@ -0,0 +1,217 @@
+import asyncio
+import contextlib
+import operator
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import reduce
+from typing import Any, AsyncIterator
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessageChunk
+from langchain_core.runnables import Runnable, RunnableConfig
+
+
+# Minimum TTFT samples before the hedge deadline is derived from the p95
+MIN_LATENCY_SAMPLES = 10
+
+_END = object()
+
+
+@dataclass
+class ProviderStats:
+    """Rolling time-to-first-token samples and circuit breaker state."""
+    ttft: deque = field(default_factory=lambda: deque(maxlen=100))
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    backup_wins: int = 0
+
+    def p95(self) -> float | None:
+        if len(self.ttft) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.ttft)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def is_open(self) -> bool:
+        return self.open_until > time.monotonic()
+
+
+@dataclass
+class _Attempt:
+    name: str
+    stream: AsyncIterator
+    started_at: float
+    first: asyncio.Task
+
+
+async def _first_chunk(stream: AsyncIterator) -> Any:
+    # StopAsyncIteration cannot be raised through a Task, so map it to a sentinel
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return _END
+
+
+class LLMRouter(Runnable):
+    """
+    Routes chat model calls between a primary and a backup provider.
+
+    - Tracks rolling time-to-first-token (TTFT) per provider.
+    - Circuit breaker: after `failure_threshold` consecutive errors a
+      provider is skipped for `open_seconds`, then tried again.
+    - Hedging: if the primary has not produced a token by its p95 TTFT
+      (or `default_hedge_seconds` until enough samples exist), the backup
+      is started too; the first to produce a token wins and the other is
+      cancelled. A provider that errors before its first token falls over
+      to the other one; errors after the first token are raised.
+
+    Drop-in for `primary.with_fallbacks([backup])` in a chain: accepts the
+    same input (a PromptValue or messages) and yields message chunks.
+    """
+
+    def __init__(
+        self,
+        primary: BaseChatModel,
+        backup: BaseChatModel,
+        hedge_enabled: bool = True,
+        default_hedge_seconds: float = 2.0,
+        failure_threshold: int = 3,
+        open_seconds: float = 30.0
+    ):
+        self.providers = {'primary': primary, 'backup': backup}
+        self.hedge_enabled = hedge_enabled
+        self.default_hedge_seconds = default_hedge_seconds
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._stats = {name: ProviderStats() for name in self.providers}
+
+    # ---- Bookkeeping ----
+
+    def _record_success(self, name: str, ttft: float) -> None:
+        stats = self._stats[name]
+        stats.ttft.append(ttft)
+        stats.consecutive_failures = 0
+        stats.open_until = 0.0
+
+    def _record_failure(self, name: str, error: BaseException) -> None:
+        stats = self._stats[name]
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        print(f"⚠️  LLM provider '{name}' failed: {error}")
+        if stats.consecutive_failures >= self.failure_threshold:
+            stats.open_until = time.monotonic() + self.open_seconds
+            print(f"🔌 LLM provider '{name}' circuit open for {self.open_seconds:.0f}s")
+
+    def _hedge_deadline(self, name: str) -> float:
+        return self._stats[name].p95() or self.default_hedge_seconds
+
+    def _route(self) -> list[str]:
+        """Providers to use in order, skipping open circuits (unless all are open)."""
+        available = [name for name in self.providers if not self._stats[name].is_open()]
+        return available or list(self.providers)
+
+    def _start(self, name: str, input: Any, config: RunnableConfig | None, **kwargs) -> _Attempt:
+        self._stats[name].requests += 1
+        stream = self.providers[name].astream(input, config, **kwargs)
+        return _Attempt(name, stream, time.monotonic(), asyncio.create_task(_first_chunk(stream)))
+
+    async def _cancel(self, attempt: _Attempt) -> None:
+        attempt.first.cancel()
+        await asyncio.gather(attempt.first, return_exceptions=True)
+        with contextlib.suppress(Exception):
+            await attempt.stream.aclose()
+
+    # ---- Runnable interface ----
+
+    def invoke(self, input: Any, config: RunnableConfig | None = None, **kwargs) -> Any:
+        last_error = None
+        for name in self._route():
+            try:
+                return self.providers[name].invoke(input, config, **kwargs)
+            except Exception as e:
+                self._record_failure(name, e)
+                last_error = e
+        raise last_error
+
+    async def ainvoke(self, input: Any, config: RunnableConfig | None = None, **kwargs) -> Any:
+        chunks = [chunk async for chunk in self.astream(input, config, **kwargs)]
+        if not chunks:
+            raise RuntimeError('LLM returned an empty response')
+        return reduce(operator.add, chunks) if isinstance(chunks[0], BaseMessageChunk) else chunks[-1]
+
+    async def astream(self, input: Any, config: RunnableConfig | None = None, **kwargs) -> AsyncIterator:
+        route = self._route()
+        pending = [self._start(route[0], input, config, **kwargs)]
+        backups = route[1:]
+        winner, first, winner_ttft = None, None, 0.0
+        last_error = None
+
+        try:
+            while pending:
+                hedge_now = self.hedge_enabled and backups and len(pending) == 1
+                timeout = self._hedge_deadline(pending[0].name) if hedge_now else None
+
+                done, _ = await asyncio.wait(
+                    [attempt.first for attempt in pending],
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Primary is slower than its p95: race the backup against it
+                    pending.append(self._start(backups.pop(0), input, config, **kwargs))
+                    continue
+
+                for attempt in [a for a in pending if a.first in done]:
+                    pending.remove(attempt)
+                    error = attempt.first.exception()
+                    if error is None:
+                        winner, first = attempt, attempt.first.result()
+                        winner_ttft = time.monotonic() - attempt.started_at
+                        break
+                    self._record_failure(attempt.name, error)
+                    last_error = error
+
+                if winner is not None:
+                    break
+                if not pending and backups:
+                    pending.append(self._start(backups.pop(0), input, config, **kwargs))
+
+        finally:
+            # Cancel the losers (and everything, if the caller went away).
+            # Only real first-token times feed the p95: a cancelled attempt's
+            # elapsed time is not a TTFT and would pull the hedge deadline down.
+            for attempt in pending:
+                if attempt is not winner:
+                    await self._cancel(attempt)
+
+        if winner is None:
+            raise last_error or RuntimeError('No LLM provider available')
+
+        self._record_success(winner.name, winner_ttft)
+        if winner.name != route[0]:
+            self._stats[winner.name].backup_wins += 1
+
+        if first is _END:
+            return
+        yield first
+        try:
+            async for chunk in winner.stream:
+                yield chunk
+        finally:
+            with contextlib.suppress(Exception):
+                await winner.stream.aclose()
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                'requests': stats.requests,
+                'failures': stats.failures,
+                'backup_wins': stats.backup_wins,
+                'p95_ttft_seconds': round(stats.p95(), 3) if stats.p95() is not None else None,
+                'circuit_open': stats.is_open(),
+            }
+            for name, stats in self._stats.items()
+        }
@@ -0,0 +1,92 @@
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+
+# One JSON file per language: {"greetings": [...], "off_topic": [...]}
+PATTERNS_DIR = Path(__file__).resolve().parent.parent / 'data' / 'query_filters'
+
+# A message counts as a greeting only if it starts with one and is this short
+GREETING_MAX_WORDS = 3
+
+
+_COMBINING_MARKS = re.compile(r'[\u0300-\u036f]')
+
+
+def fold(text: str) -> str:
+    """Lowercases, strips accents and collapses whitespace ("Qué  Película" -> "que pelicula")."""
+    if not text.isascii():
+        text = _COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text))
+    return ' '.join(text.casefold().split())
+
+
+def _trie_pattern(phrases: list[str]) -> str:
+    """
+    Builds a regex alternation shaped like a trie of the phrases, so the
+    engine follows shared prefixes once instead of retrying every phrase
+    at every position.
+    """
+    trie: dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node: dict) -> str:
+        branches, optional = [], False
+        for char, child in sorted(node.items()):
+            if char == '':
+                optional = True
+            else:
+                # Spaces match any run of whitespace/punctuation between words
+                token = r'\W+' if char == ' ' else re.escape(char)
+                branches.append(token + render(child))
+
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if optional:
+            body = '(?:' + body + ')?' if len(branches) == 1 else body + '?'
+        return body
+
+    return render(trie)
+
+
+class QueryFilter:
+    """
+    Greeting and off-topic detection for incoming questions.
+
+    Patterns from every language are folded and compiled once into a single
+    regex per category, so a check is one scan of the folded query. Because
+    both patterns and queries are accent-folded, "película", "pelicula" and
+    "PELÍCULA" all match the same entry.
+    """
+
+    def __init__(self, patterns: dict[str, dict[str, list[str]]]):
+        greetings = {fold(p) for lang in patterns.values() for p in lang.get('greetings', [])}
+        off_topic = {fold(p) for lang in patterns.values() for p in lang.get('off_topic', [])}
+        self.languages = sorted(patterns)
+        self._greeting = re.compile(r'^\W*' + _trie_pattern(sorted(greetings)) + r'\b')
+        self._off_topic = re.compile(r'\b' + _trie_pattern(sorted(off_topic)) + r'\b')
+
+    @classmethod
+    def from_directory(cls, directory: Path) -> 'QueryFilter':
+        patterns = {
+            path.stem: json.loads(path.read_text(encoding='utf-8'))
+            for path in sorted(directory.glob('*.json'))
+        }
+        return cls(patterns)
+
+    def is_greeting(self, query: str) -> bool:
+        folded = fold(query)
+        return len(folded.split()) <= GREETING_MAX_WORDS and self._greeting.match(folded) is not None
+
+    def match_off_topic(self, query: str) -> str | None:
+        """Returns the matched off-topic phrase, or None."""
+        match = self._off_topic.search(fold(query))
+        return match.group(0) if match else None
+
+
+query_filter = QueryFilter.from_directory(PATTERNS_DIR)
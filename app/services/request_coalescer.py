@@ -0,0 +1,256 @@
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Awaitable, Callable, Hashable
+
+from app.core.settings import settings
+
+
+class Broadcast:
+    """
+    Items produced by one in-flight pipeline, replayable by any number of
+    subscribers. Late subscribers first receive everything produced so far.
+
+    Items are kept for replay (a reply is small), but the producer can be
+    held back with wait_for_readers() so it never runs more than `max_ahead`
+    items ahead of its fastest subscriber.
+    """
+
+    def __init__(self, on_abandoned: Callable[[bool], None] | None = None):
+        self.items: list[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.on_abandoned = on_abandoned
+        self._subscriptions: set[Subscription] = set()
+        self._changed = asyncio.Event()
+        self._read = asyncio.Event()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def _notify(self) -> None:
+        # Waiters hold the old event; swapping it wakes all of them exactly once
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _notify_read(self) -> None:
+        self._read.set()
+        self._read = asyncio.Event()
+
+    async def wait_for_readers(self, max_ahead: int) -> None:
+        """
+        Blocks the producer while every subscriber is `max_ahead` or more
+        items behind, so a slow client slows the upstream stream down.
+        With no subscribers at all (a client about to resume) it does not wait.
+        """
+        while self._subscriptions:
+            furthest = max(subscription.position for subscription in self._subscriptions)
+            if len(self.items) - furthest < max_ahead:
+                return
+            await self._read.wait()
+
+    def publish(self, item: Any) -> None:
+        self.items.append(item)
+        self._notify()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def subscribe(self) -> 'Subscription':
+        return Subscription(self)
+
+    def _unsubscribe(self, subscription: 'Subscription', immediate: bool = False) -> None:
+        self._subscriptions.discard(subscription)
+        self._notify_read()
+        if not self._subscriptions and not self.done and self.on_abandoned is not None:
+            # Nobody is reading any more: stop paying for the pipeline
+            self.on_abandoned(immediate)
+
+
+class Subscription:
+    """
+    Async iterator over a Broadcast. Counts as a subscriber from creation
+    until it is exhausted or closed with aclose(), even if never iterated.
+    """
+
+    def __init__(self, broadcast: Broadcast):
+        self.broadcast = broadcast
+        self.position = 0
+        self.closed = False
+        broadcast._subscriptions.add(self)
+
+    def __aiter__(self) -> 'Subscription':
+        return self
+
+    async def __anext__(self) -> Any:
+        broadcast = self.broadcast
+        while not self.closed:
+            if self.position < len(broadcast.items):
+                self.position += 1
+                broadcast._notify_read()
+                return broadcast.items[self.position - 1]
+
+            if broadcast.done:
+                self._close()
+                if broadcast.error is not None:
+                    raise broadcast.error
+                break
+
+            await broadcast._changed.wait()
+
+        raise StopAsyncIteration
+
+    def _close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.broadcast._unsubscribe(self)
+
+    async def aclose(self) -> None:
+        self._close()
+
+    def abandon(self) -> None:
+        """
+        Closes the subscription (if still open) for a reader that will not
+        come back: when nobody else is reading, the pipeline is cancelled
+        right away instead of after its grace period.
+        """
+        self.closed = True
+        self.broadcast._unsubscribe(self, immediate=True)
+
+
+class RequestCoalescer:
+    """
+    Single-flight execution of async generators keyed by request identity.
+
+    The first caller for a key starts the pipeline as a background task;
+    concurrent callers with the same key attach to its Broadcast instead of
+    running it again. With `retain_seconds` a finished broadcast is kept
+    that long, so retries (idempotency keys) and resumed streams replay the
+    same output.
+
+    The pipeline runs at most `max_ahead` items ahead of its fastest
+    subscriber, so backpressure from slow clients reaches the LLM stream.
+
+    When the last subscriber of a running pipeline goes away (every client
+    disconnected) the pipeline task is cancelled, which cancels the
+    upstream LLM stream. With `grace_seconds` the cancellation waits that
+    long for a subscriber to come back (a client reconnecting), unless the
+    last one left with Subscription.abandon().
+    """
+
+    def __init__(self, max_ahead: int):
+        self.max_ahead = max_ahead
+        self._in_flight: dict[Hashable, Broadcast] = {}
+        self._retained: dict[Hashable, tuple[float, Broadcast]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.started = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def _purge_retained(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._retained.items() if expires_at <= now]:
+            del self._retained[key]
+
+    async def _run(self, key: Hashable, broadcast: Broadcast, source: AsyncGenerator, retain_seconds: float) -> None:
+        try:
+            # Closed right away on cancellation too, which ends the LLM stream
+            # and releases its DB session without waiting for the GC
+            async with aclosing(source):
+                async for item in source:
+                    broadcast.publish(item)
+                    await broadcast.wait_for_readers(self.max_ahead)
+            broadcast.finish()
+        except BaseException as e:
+            # Kept on the broadcast for subscribers: drop the traceback so it
+            # does not hold the pipeline's frames alive
+            broadcast.finish(e.with_traceback(None))
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            if self._in_flight.get(key) is broadcast:
+                del self._in_flight[key]
+            if retain_seconds and broadcast.error is None:
+                self._retained[key] = (time.monotonic() + retain_seconds, broadcast)
+
+    def stream(
+        self,
+        key: Hashable,
+        factory: Callable[[], AsyncGenerator],
+        retain_seconds: float = 0,
+        grace_seconds: float = 0
+    ) -> Subscription:
+        """
+        Returns an iterator over the items of the pipeline for `key`, starting
+        it with `factory()` unless one is already running (or retained).
+        """
+        subscription = self.attach(key)
+        if subscription is not None:
+            self.coalesced += 1
+            return subscription
+
+        self.started += 1
+
+        def cancel_if_abandoned() -> None:
+            if broadcast.subscribers or broadcast.done or task.cancelled() or task.cancelling():
+                return
+            self.abandoned += 1
+            # New callers for the key must start afresh, not join a cancelled run
+            if self._in_flight.get(key) is broadcast:
+                del self._in_flight[key]
+            task.cancel()
+
+        def abandon(immediate: bool) -> None:
+            if grace_seconds and not immediate:
+                asyncio.get_running_loop().call_later(grace_seconds, cancel_if_abandoned)
+            else:
+                cancel_if_abandoned()
+
+        broadcast = Broadcast(on_abandoned=abandon)
+        self._in_flight[key] = broadcast
+        task = asyncio.create_task(self._run(key, broadcast, factory(), retain_seconds))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return broadcast.subscribe()
+
+    def attach(self, key: Hashable) -> Subscription | None:
+        """Subscribes to the running or retained pipeline for `key`, if any."""
+        self._purge_retained()
+
+        broadcast = self._in_flight.get(key)
+        if broadcast is None and key in self._retained:
+            broadcast = self._retained[key][1]
+
+        return broadcast.subscribe() if broadcast is not None else None
+
+    async def run_once(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        retain_seconds: float = 0
+    ) -> Any:
+        """Single-flight for a coroutine: concurrent callers share one result."""
+        async def single_item() -> AsyncGenerator:
+            yield await factory()
+
+        subscription = self.stream(key, single_item, retain_seconds=retain_seconds)
+        try:
+            async for result in subscription:
+                return result
+        finally:
+            await subscription.aclose()
+
+    def stats(self) -> dict:
+        return {
+            'started': self.started,
+            'coalesced': self.coalesced,
+            'abandoned': self.abandoned,
+            'in_flight': len(self._in_flight),
+            'retained': len(self._retained),
+        }
+
+
+request_coalescer = RequestCoalescer(max_ahead=settings.STREAM_BUFFER_CHUNKS)
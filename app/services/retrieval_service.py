@@ -0,0 +1,228 @@
+from dataclasses import dataclass
+
+from sqlalchemy import func, literal, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.models.rag_documents import TEXT_SEARCH_CONFIGS, RagDocument, shorten_embedding
+from app.services.vector_index import vector_index
+
+
+DEFAULT_TOP_K = 5
+
+
+def _embedding_column():
+    """The stored embedding searched for EMBEDDING_PRECISION ('full' or 'half')."""
+    if settings.EMBEDDING_PRECISION == 'half':
+        return RagDocument.embedding_half
+    return RagDocument.embedding
+
+
+def _nearest_chunks(query_vector: list[float], language_filter, limit: int, name: str):
+    """
+    Subquery of (id, distance) for the `limit` active chunks nearest the query.
+
+    With TWO_STAGE_RETRIEVAL, an HNSW scan over embedding_short picks
+    TWO_STAGE_CANDIDATES rows and only those are re-ranked with the full
+    embedding, so the hot index is the small one.
+    """
+    embedding = _embedding_column()
+
+    if not settings.TWO_STAGE_RETRIEVAL:
+        distance = embedding.cosine_distance(query_vector)
+        return (
+            select(RagDocument.id, distance.label('distance'))
+            .where(language_filter)
+            .where(RagDocument.active == True)
+            .order_by(distance)
+            .limit(limit)
+            .subquery(name)
+        )
+
+    short_distance = RagDocument.embedding_short.cosine_distance(shorten_embedding(query_vector))
+    candidates = (
+        select(RagDocument.id)
+        .where(language_filter)
+        .where(RagDocument.active == True)
+        .order_by(short_distance)
+        .limit(max(limit, settings.TWO_STAGE_CANDIDATES))
+        .subquery(f'{name}_candidates')
+    )
+
+    distance = embedding.cosine_distance(query_vector)
+    return (
+        select(RagDocument.id, distance.label('distance'))
+        .join(candidates, RagDocument.id == candidates.c.id)
+        .order_by(distance)
+        .limit(limit)
+        .subquery(name)
+    )
+
+
+@dataclass
+class RetrievedChunk:
+    """A retrieved RAG chunk and its cosine distance to the query."""
+    id: int
+    source: str
+    content: str
+    distance: float
+    token_count: int | None = None
+
+
+async def _search_database(
+    db: AsyncSession,
+    query_vector: list[float],
+    language: str,
+    limit: int
+) -> list[RetrievedChunk]:
+    # SET LOCAL only lasts for the current transaction
+    await db.execute(text(f'SET LOCAL hnsw.ef_search = {int(settings.HNSW_EF_SEARCH)}'))
+
+    nearest = _nearest_chunks(
+        query_vector, RagDocument.language == literal(language, literal_execute=True), limit, 'nearest'
+    )
+
+    # Project only what the prompt needs; the vector itself never leaves Postgres
+    stmt = (
+        select(
+            RagDocument.id,
+            RagDocument.source,
+            RagDocument.content,
+            RagDocument.token_count,
+            nearest.c.distance
+        )
+        .join(nearest, RagDocument.id == nearest.c.id)
+        .order_by(nearest.c.distance)
+    )
+
+    result = await db.execute(stmt)
+    return [
+        RetrievedChunk(
+            id=row.id,
+            source=row.source,
+            content=row.content,
+            distance=row.distance,
+            token_count=row.token_count
+        )
+        for row in result.all()
+    ]
+
+
+async def _search_hybrid(
+    db: AsyncSession,
+    query_vector: list[float],
+    query_text: str,
+    language: str,
+    limit: int
+) -> list[RetrievedChunk]:
+    """
+    Runs the vector and full-text searches as CTEs of a single statement and
+    fuses their rankings with reciprocal rank fusion:
+    score = sum(1 / (RRF_K + rank)) over the lists a chunk appears in.
+    """
+    await db.execute(text(f'SET LOCAL hnsw.ef_search = {int(settings.HNSW_EF_SEARCH)}'))
+
+    candidates = settings.HYBRID_CANDIDATES
+    rrf_k = settings.RRF_K
+    language_filter = RagDocument.language == literal(language, literal_execute=True)
+    ts_config = literal_column(f"'{TEXT_SEARCH_CONFIGS[language]}'::regconfig")
+    ts_query = func.websearch_to_tsquery(ts_config, query_text)
+
+    # Rank after LIMIT, so the ORDER BY distance can still use the HNSW index
+    vector_hits = _nearest_chunks(query_vector, language_filter, candidates, 'vector_hits')
+    vector_ranked = select(
+        vector_hits.c.id,
+        func.row_number().over(order_by=vector_hits.c.distance).label('rank')
+    ).cte('vector_ranked')
+
+    lexical_score = func.ts_rank_cd(RagDocument.search_vector, ts_query)
+    lexical_hits = (
+        select(RagDocument.id, lexical_score.label('score'))
+        .where(language_filter)
+        .where(RagDocument.active == True)
+        .where(RagDocument.search_vector.op('@@')(ts_query))
+        .order_by(lexical_score.desc())
+        .limit(candidates)
+        .subquery('lexical_hits')
+    )
+    lexical_ranked = select(
+        lexical_hits.c.id,
+        func.row_number().over(order_by=lexical_hits.c.score.desc()).label('rank')
+    ).cte('lexical_ranked')
+
+    fused = (
+        select(
+            func.coalesce(vector_ranked.c.id, lexical_ranked.c.id).label('id'),
+            (
+                func.coalesce(1.0 / (rrf_k + vector_ranked.c.rank), 0.0)
+                + func.coalesce(1.0 / (rrf_k + lexical_ranked.c.rank), 0.0)
+            ).label('rrf_score')
+        )
+        .select_from(vector_ranked.join(
+            lexical_ranked, vector_ranked.c.id == lexical_ranked.c.id, full=True
+        ))
+        .subquery('fused')
+    )
+
+    stmt = (
+        select(
+            RagDocument.id,
+            RagDocument.source,
+            RagDocument.content,
+            RagDocument.token_count,
+            _embedding_column().cosine_distance(query_vector).label('distance')
+        )
+        .join(fused, RagDocument.id == fused.c.id)
+        .order_by(fused.c.rrf_score.desc())
+        .limit(limit)
+    )
+
+    result = await db.execute(stmt)
+    return [
+        RetrievedChunk(
+            id=row.id,
+            source=row.source,
+            content=row.content,
+            distance=row.distance,
+            token_count=row.token_count
+        )
+        for row in result.all()
+    ]
+
+
+async def search_similar_documents(
+    db: AsyncSession,
+    query_vector: list[float],
+    language: str,
+    limit: int = DEFAULT_TOP_K,
+    query_text: str | None = None
+) -> list[RetrievedChunk]:
+    """
+    Returns the active chunks most relevant to the query for one language.
+
+    Uses the in-process vector index when VECTOR_INDEX_ENABLED is set and the
+    language is loaded. Otherwise queries Postgres: hybrid (vector + full
+    text, rank-fused) when HYBRID_SEARCH_ENABLED and query_text is given,
+    pure vector search if not. The language is rendered inline (it is
+    already validated) so the planner can match the per-language partial
+    HNSW index instead of scanning every vector.
+
+    Args:
+        db: Database session
+        query_vector: Embedding of the user's question
+        language: Validated language code ('en', 'es', 'pt')
+        limit: Number of chunks to return
+        query_text: Raw question, used for the lexical half of hybrid search
+
+    Returns:
+        Matching chunks, most relevant first
+    """
+    if settings.VECTOR_INDEX_ENABLED:
+        hits = vector_index.search(language, query_vector, limit)
+        if hits is not None:
+            return [RetrievedChunk(*hit) for hit in hits]
+
+    if settings.HYBRID_SEARCH_ENABLED and query_text:
+        return await _search_hybrid(db, query_vector, query_text, language, limit)
+
+    return await _search_database(db, query_vector, language, limit)
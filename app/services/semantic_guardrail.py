@@ -0,0 +1,111 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import numpy as np
+
+from app.core.settings import settings
+
+
+# One JSON file per language: {"on_topic": {intent: [phrases]}, "off_topic": {intent: [phrases]}}
+INTENTS_DIR = Path(__file__).resolve().parent.parent / 'data' / 'guardrail_intents'
+
+EmbedQuery = Callable[[str], Awaitable[list[float]]]
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticGuardrail:
+    """
+    Nearest-centroid check of the query embedding against example intents.
+
+    Each intent (e.g. "skills", "weather") is the normalized mean embedding
+    of a few seed phrases. A question is blocked when its closest off-topic
+    centroid beats its closest on-topic centroid by at least `margin`, so
+    borderline questions still reach retrieval and the LLM.
+
+    Seed embeddings go through the embedding cache, so after the first
+    start-up loading the centroids costs no API calls.
+    """
+
+    def __init__(self, intents_dir: Path, margin: float):
+        self.intents_dir = intents_dir
+        self.margin = margin
+        self._on_topic: dict[str, np.ndarray] = {}
+        self._off_topic: dict[str, np.ndarray] = {}
+        self._off_topic_names: dict[str, list[str]] = {}
+        self.checked = 0
+        self.blocked = 0
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._on_topic)
+
+    async def _centroids(
+        self,
+        intents: dict[str, list[str]],
+        embed_query: EmbedQuery
+    ) -> tuple[list[str], np.ndarray]:
+        names = list(intents)
+        centroids = []
+        for name in names:
+            vectors = await asyncio.gather(*(embed_query(phrase) for phrase in intents[name]))
+            centroids.append(_normalize(np.mean(np.asarray(vectors, dtype=np.float32), axis=0)))
+        return names, np.vstack(centroids)
+
+    async def load(self, embed_query: EmbedQuery) -> None:
+        """Embeds the seed phrases of every language and builds the centroids."""
+        for path in sorted(self.intents_dir.glob('*.json')):
+            language = path.stem
+            try:
+                data = json.loads(path.read_text(encoding='utf-8'))
+                _, on_topic = await self._centroids(data['on_topic'], embed_query)
+                names, off_topic = await self._centroids(data['off_topic'], embed_query)
+            except Exception as e:
+                # That language is simply not guarded
+                print(f"⚠️  Failed to build guardrail centroids for '{language}': {e}")
+                continue
+
+            self._on_topic[language] = on_topic
+            self._off_topic[language] = off_topic
+            self._off_topic_names[language] = names
+
+        print(f"🛡️  Semantic guardrail ready for: {', '.join(sorted(self._on_topic)) or 'none'}")
+
+    def check(self, language: str, query_vector) -> str | None:
+        """
+        Returns the off-topic intent the query matched, or None if it may
+        be on topic (or no centroids are loaded for the language).
+        """
+        if language not in self._on_topic:
+            return None
+
+        self.checked += 1
+        query = _normalize(query_vector)
+        on_topic_score = float(np.max(self._on_topic[language] @ query))
+        off_topic_scores = self._off_topic[language] @ query
+        best = int(np.argmax(off_topic_scores))
+
+        if off_topic_scores[best] - on_topic_score < self.margin:
+            return None
+
+        self.blocked += 1
+        return self._off_topic_names[language][best]
+
+    def stats(self) -> dict:
+        return {
+            'ready': self.ready,
+            'checked': self.checked,
+            'blocked': self.blocked,
+        }
+
+
+semantic_guardrail = SemanticGuardrail(
+    intents_dir=INTENTS_DIR,
+    margin=settings.SEMANTIC_GUARDRAIL_MARGIN,
+)
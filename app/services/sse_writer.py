@@ -0,0 +1,81 @@
+import asyncio
+import contextlib
+import time
+from typing import AsyncGenerator, AsyncIterator
+
+
+def format_event(data: str, event: str | None = None, id: str | None = None) -> str:
+    """
+    Frames one Server-Sent Event.
+
+    Each line of `data` gets its own `data:` field, which clients join back
+    with '\n', so text with newlines needs no escaping. `id` is what the
+    client sends back as Last-Event-ID when it reconnects.
+    """
+    lines = [f'id: {id}'] if id is not None else []
+    if event:
+        lines.append(f'event: {event}')
+    normalized = data.replace('\r\n', '\n').replace('\r', '\n')
+    lines += [f'data: {line}' for line in normalized.split('\n')]
+    return '\n'.join(lines) + '\n\n'
+
+
+def format_comment(text: str) -> str:
+    """An SSE comment: ignored by clients, but flushes bytes through proxies."""
+    return f': {text}\n\n'
+
+
+async def coalesce(
+    chunks: AsyncIterator[str],
+    window_seconds: float,
+    max_chars: int
+) -> AsyncGenerator[str, None]:
+    """
+    Joins chunks into larger pieces so each SSE frame carries several tokens.
+
+    A piece is emitted `window_seconds` after its first chunk arrived, or
+    as soon as it reaches `max_chars`, whichever comes first; the first
+    token therefore waits at most one window.
+    """
+    iterator = chunks.__aiter__()
+    next_chunk: asyncio.Future | None = None
+    parts: list[str] = []
+    size = 0
+    deadline = 0.0
+
+    try:
+        while True:
+            next_chunk = next_chunk or asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, deadline - time.monotonic()) if parts else None
+            done, _ = await asyncio.wait({next_chunk}, timeout=timeout)
+
+            if not done:
+                # Window elapsed: flush what we have
+                yield ''.join(parts)
+                parts, size = [], 0
+                continue
+
+            future, next_chunk = next_chunk, None
+            try:
+                chunk = future.result()
+            except StopAsyncIteration:
+                break
+
+            if not parts:
+                deadline = time.monotonic() + window_seconds
+            parts.append(chunk)
+            size += len(chunk)
+
+            if size >= max_chars:
+                yield ''.join(parts)
+                parts, size = [], 0
+
+        if parts:
+            yield ''.join(parts)
+
+    finally:
+        if next_chunk is not None:
+            next_chunk.cancel()
+            await asyncio.gather(next_chunk, return_exceptions=True)
+        with contextlib.suppress(Exception):
+            await iterator.aclose()
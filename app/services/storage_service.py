@@ -1,4 +1,5 @@
 import asyncio
+from tempfile import SpooledTemporaryFile
 
 import boto3
 from botocore.config import Config
@@ -34,3 +35,18 @@ async def upload_file_to_r2(
     full_key = f'{folder}/{file_name}'
     public_url = await asyncio.to_thread(_upload_to_r2, file_bytes, full_key, content_type)
     return public_url
+
+
+def _download_from_r2(full_key: str, spool_max_size: int) -> SpooledTemporaryFile:
+    # Small files stay in memory; large ones roll over to disk instead of RSS
+    buffer = SpooledTemporaryFile(max_size=spool_max_size)
+    s3_client.download_fileobj(settings.R2_BUCKET_NAME, full_key, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+async def download_file_from_r2(
+    full_key: str,
+    spool_max_size: int = 8 * 1024 * 1024) -> SpooledTemporaryFile:
+
+    return await asyncio.to_thread(_download_from_r2, full_key, spool_max_size)
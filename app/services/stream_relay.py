@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+import time
+from typing import AsyncGenerator, AsyncIterator
+
+from starlette.requests import Request
+
+
+# How often a stream that is waiting on the model checks whether its client left
+DISCONNECT_CHECK_SECONDS = 1.0
+
+
+class StreamMetrics:
+    """
+    Counters for streamed generations and the ones cut short by clients.
+
+    Tokens saved by a cancellation are estimated as the average length of
+    completed replies minus what had been generated when it was cancelled.
+    """
+
+    def __init__(self):
+        self.disconnects = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.completed_tokens = 0
+        self.estimated_tokens_saved = 0
+
+    def record_completed(self, tokens: int) -> None:
+        self.completed += 1
+        self.completed_tokens += tokens
+
+    def record_cancelled(self, tokens_generated: int) -> None:
+        self.cancelled += 1
+        if self.completed:
+            average = self.completed_tokens / self.completed
+            self.estimated_tokens_saved += max(0, round(average - tokens_generated))
+
+    def stats(self) -> dict:
+        return {
+            'disconnects': self.disconnects,
+            'generations_completed': self.completed,
+            'generations_cancelled': self.cancelled,
+            'estimated_tokens_saved': self.estimated_tokens_saved,
+        }
+
+
+stream_metrics = StreamMetrics()
+
+
+async def relay(
+    chunks: AsyncIterator[str],
+    request: Request,
+    max_buffered: int
+) -> AsyncGenerator[str, None]:
+    """
+    Yields `chunks` to the client through a bounded buffer.
+
+    A producer task pulls from `chunks` into a queue of at most
+    `max_buffered` items. When the client reads slower than the model
+    writes, the queue fills up and the producer stops pulling. When
+    `chunks` is a coalescer subscription, the coalesced pipeline in turn
+    pauses once it is STREAM_BUFFER_CHUNKS ahead of its fastest reader
+    (Broadcast.wait_for_readers), so the backpressure reaches the LLM stream.
+
+    The client is checked for a disconnect at least every
+    DISCONNECT_CHECK_SECONDS (also while waiting on the model). When it is
+    gone, or this generator is closed, the producer is cancelled and
+    `chunks` closed, which cancels the upstream LLM request.
+
+    Errors raised by `chunks` are re-raised here.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+
+    async def produce() -> None:
+        try:
+            async for chunk in chunks:
+                await queue.put(('chunk', chunk))
+        except Exception as e:
+            await queue.put(('error', e))
+        else:
+            await queue.put(('end', None))
+
+    producer = asyncio.create_task(produce())
+    getter: asyncio.Future | None = None
+    last_check = time.monotonic()
+
+    try:
+        while True:
+            getter = getter or asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=DISCONNECT_CHECK_SECONDS)
+
+            if not done or time.monotonic() - last_check >= DISCONNECT_CHECK_SECONDS:
+                last_check = time.monotonic()
+                if await request.is_disconnected():
+                    stream_metrics.disconnects += 1
+                    return
+
+            if not done:
+                continue
+
+            kind, value = getter.result()
+            getter = None
+            if kind == 'end':
+                return
+            if kind == 'error':
+                raise value
+            yield value
+
+    finally:
+        if getter is not None:
+            getter.cancel()
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        with contextlib.suppress(Exception):
+            await chunks.aclose()
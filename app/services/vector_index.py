@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine
+from app.core.settings import settings
+from app.models.rag_documents import RAG_LANGUAGES, RagDocument
+
+
+# Snapshot versions younger than this are never deleted by another process
+SNAPSHOT_GRACE_SECONDS = 300
+
+
+# ============================================================================
+# PER-LANGUAGE MATRIX
+# ============================================================================
+
+@dataclass
+class LanguageIndex:
+    """Contiguous float32 matrix of L2-normalized embeddings for one language."""
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    matrix: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=np.float32))
+    sources: list[str] = field(default_factory=list)
+    contents: list[str] = field(default_factory=list)
+    # Newest RagDocument.updated_at among the indexed rows
+    updated_at: datetime | None = None
+    refreshed_at: float = 0.0
+
+    @property
+    def max_id(self) -> int:
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    @property
+    def fingerprint(self) -> tuple[int, int, datetime | None]:
+        """(count, sum of ids, newest updated_at) of the indexed rows."""
+        return len(self.ids), int(self.ids.sum()), self.updated_at
+
+    def search(self, query_vector, limit: int) -> list[tuple[int, str, str, float]]:
+        if not len(self.ids):
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        # Rows are normalized, so one matmul gives every cosine similarity
+        scores = self.matrix @ query
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            (int(self.ids[i]), self.sources[i], self.contents[i], float(1.0 - scores[i]))
+            for i in top
+        ]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+# ============================================================================
+# IN-PROCESS VECTOR INDEX
+# ============================================================================
+
+class InMemoryVectorIndex:
+    """
+    Keeps every active RagDocument embedding in memory, per language.
+
+    Each language is persisted as a versioned `.npy` snapshot that new workers
+    open with mmap_mode='r', so startup only has to fetch rows added since
+    the snapshot.
+    """
+
+    def __init__(self, snapshot_dir: str, refresh_seconds: int):
+        self.snapshot_dir = snapshot_dir
+        self.refresh_seconds = refresh_seconds
+        self._indexes: dict[str, LanguageIndex] = {}
+        self._locks = {language: asyncio.Lock() for language in RAG_LANGUAGES}
+        self._pending_refreshes: set[str] = set()
+        self._background_tasks: set[asyncio.Task] = set()
+
+    # ---- Snapshot persistence ----
+    #
+    # A snapshot is a version directory (`<language>-<uuid>/` holding
+    # embeddings.npy, ids.npy and meta.json) written under a private
+    # temporary name, then published by atomically replacing the
+    # `<language>.current` pointer file. Readers therefore always see one
+    # complete, self-consistent version, even with several processes saving.
+
+    def _pointer_path(self, language: str) -> str:
+        return os.path.join(self.snapshot_dir, f'{language}.current')
+
+    def _load_snapshot(self, language: str) -> LanguageIndex | None:
+        try:
+            with open(self._pointer_path(language), encoding='utf-8') as pointer_file:
+                version_dir = os.path.join(self.snapshot_dir, pointer_file.read().strip())
+        except FileNotFoundError:
+            return None
+
+        with open(os.path.join(version_dir, 'meta.json'), encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+
+        index = LanguageIndex(
+            ids=np.load(os.path.join(version_dir, 'ids.npy')),
+            matrix=np.load(os.path.join(version_dir, 'embeddings.npy'), mmap_mode='r'),
+            sources=meta['sources'],
+            contents=meta['contents'],
+            # Older snapshots lack it, which just forces one rebuild
+            updated_at=datetime.fromisoformat(meta['updated_at']) if meta.get('updated_at') else None,
+        )
+
+        rows = {len(index.ids), index.matrix.shape[0], len(index.sources), len(index.contents)}
+        if len(rows) != 1:
+            print(f"⚠️  Discarding inconsistent vector snapshot for '{language}'")
+            return None
+        return index
+
+    def _save_snapshot(self, language: str, index: LanguageIndex) -> None:
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        version = f'{language}-{uuid.uuid4().hex}'
+        tmp_dir = os.path.join(self.snapshot_dir, f'{version}.tmp')
+
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'embeddings.npy'), index.matrix)
+        np.save(os.path.join(tmp_dir, 'ids.npy'), index.ids)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as meta_file:
+            json.dump({
+                'sources': index.sources,
+                'contents': index.contents,
+                'updated_at': index.updated_at.isoformat() if index.updated_at else None,
+            }, meta_file)
+        os.rename(tmp_dir, os.path.join(self.snapshot_dir, version))
+
+        pointer_path = self._pointer_path(language)
+        tmp_pointer = f'{pointer_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_pointer, 'w', encoding='utf-8') as pointer_file:
+            pointer_file.write(version)
+        os.replace(tmp_pointer, pointer_path)
+
+        self._remove_old_snapshots(language)
+
+    def _remove_old_snapshots(self, language: str) -> None:
+        """Deletes superseded versions (open mmaps of them stay valid on POSIX)."""
+        with open(self._pointer_path(language), encoding='utf-8') as pointer_file:
+            current = pointer_file.read().strip()
+
+        cutoff = time.time() - SNAPSHOT_GRACE_SECONDS
+        for name in os.listdir(self.snapshot_dir):
+            path = os.path.join(self.snapshot_dir, name)
+            # Recent versions may belong to another process about to publish them
+            if (name.startswith(f'{language}-') and name != current
+                    and os.path.isdir(path) and os.path.getmtime(path) < cutoff):
+                shutil.rmtree(path, ignore_errors=True)
+
+    # ---- Loading & refreshing ----
+
+    async def load(self) -> None:
+        """Opens the snapshots (if any) and catches up with the database."""
+        for language in RAG_LANGUAGES:
+            try:
+                snapshot = await asyncio.to_thread(self._load_snapshot, language)
+            except Exception as e:
+                print(f"⚠️  Ignoring unreadable vector snapshot for '{language}': {e}")
+                snapshot = None
+
+            if snapshot is not None:
+                self._indexes[language] = snapshot
+
+            await self.refresh(language)
+
+    async def refresh(self, language: str, rebuild: bool = False) -> None:
+        """
+        Appends chunks added since the last refresh.
+
+        Falls back to a full rebuild when any indexed row changed: the
+        (count, sum of ids, newest updated_at) of the active rows up to
+        max_id must match the index, so deactivations, reactivations,
+        deletions and edits of content or embedding are all caught.
+        `rebuild` skips the check (ingestion passes it after (de)activating rows).
+        """
+        async with self._locks[language]:
+            current = self._indexes.get(language, LanguageIndex())
+            changed = language not in self._indexes
+            if rebuild:
+                current = LanguageIndex()
+                changed = True
+
+            async with AsyncSession(engine) as session:
+                active_filter = (
+                    (RagDocument.language == language) & (RagDocument.active == True)
+                )
+
+                if len(current.ids):
+                    result = await session.execute(
+                        select(
+                            func.count(),
+                            func.coalesce(func.sum(RagDocument.id), 0),
+                            func.max(RagDocument.updated_at),
+                        )
+                        .where(active_filter)
+                        .where(RagDocument.id <= current.max_id)
+                    )
+                    count, id_sum, updated_at = result.one()
+                    if (count, int(id_sum), updated_at) != current.fingerprint:
+                        current = LanguageIndex()
+                        changed = True
+
+                result = await session.execute(
+                    select(
+                        RagDocument.id,
+                        RagDocument.source,
+                        RagDocument.content,
+                        RagDocument.embedding,
+                        RagDocument.updated_at,
+                    )
+                    .where(active_filter)
+                    .where(RagDocument.id > current.max_id)
+                    .order_by(RagDocument.id)
+                )
+                rows = result.all()
+
+            if rows:
+                newest = max(row.updated_at for row in rows)
+                new_matrix = _normalize_rows(np.vstack([row.embedding for row in rows]))
+                matrix = np.vstack([current.matrix, new_matrix]) if len(current.ids) else new_matrix
+                current = LanguageIndex(
+                    ids=np.concatenate([current.ids, np.array([row.id for row in rows], dtype=np.int64)]),
+                    matrix=np.ascontiguousarray(matrix, dtype=np.float32),
+                    sources=current.sources + [row.source for row in rows],
+                    contents=current.contents + [row.content for row in rows],
+                    updated_at=max(current.updated_at, newest) if current.updated_at else newest,
+                )
+                changed = True
+
+            current.refreshed_at = time.monotonic()
+            self._indexes[language] = current
+
+            if changed:
+                await asyncio.to_thread(self._save_snapshot, language, current)
+                print(f"🧮 Vector index for '{language}' holds {len(current.ids)} chunks.")
+
+    async def _background_refresh(self, language: str) -> None:
+        try:
+            await self.refresh(language)
+        except Exception as e:
+            print(f"⚠️  Vector index refresh failed for '{language}': {e}")
+        finally:
+            self._pending_refreshes.discard(language)
+
+    def _schedule_refresh(self, language: str) -> None:
+        if language in self._pending_refreshes:
+            return
+        self._pending_refreshes.add(language)
+        task = asyncio.create_task(self._background_refresh(language))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    # ---- Query ----
+
+    def search(self, language: str, query_vector, limit: int) -> list[tuple[int, str, str, float]] | None:
+        """
+        Returns (id, source, content, cosine_distance) tuples, closest first,
+        or None if this language has not been loaded yet.
+        """
+        index = self._indexes.get(language)
+        if index is None:
+            return None
+
+        # Other workers may have ingested documents; catch up off the hot path
+        if time.monotonic() - index.refreshed_at > self.refresh_seconds:
+            self._schedule_refresh(language)
+
+        return index.search(query_vector, limit)
+
+
+vector_index = InMemoryVectorIndex(
+    snapshot_dir=settings.VECTOR_INDEX_DIR,
+    refresh_seconds=settings.VECTOR_INDEX_REFRESH_SECONDS,
+)
@@ -0,0 +1,85 @@
+"""
+Recall of half-precision (halfvec) embeddings against full precision.
+
+Ranks a corpus by exact cosine similarity twice, once with float32 vectors
+and once with the same vectors rounded to float16 (what `halfvec` stores),
+and reports recall@k of the float16 ranking. Uses a synthetic clustered
+corpus by default, or the active chunks of one language with --language.
+
+    poetry run python -m benchmarks.bench_halfvec_recall --k 5
+    poetry run python -m benchmarks.bench_halfvec_recall --language en
+"""
+import argparse
+import asyncio
+
+import numpy as np
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def synthetic_corpus(size: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    # Embeddings of one CV cluster around a few topics, so neighbours are close
+    centers = rng.standard_normal((max(1, size // 50), dim))
+    assignment = rng.integers(0, len(centers), size)
+    return normalize(centers[assignment] + 0.6 * rng.standard_normal((size, dim))).astype(np.float32)
+
+
+async def corpus_from_database(language: str) -> np.ndarray:
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.core.database import engine
+    from app.models.rag_documents import RagDocument
+
+    async with AsyncSession(engine) as session:
+        rows = await session.scalars(
+            select(RagDocument.embedding)
+            .where(RagDocument.language == language)
+            .where(RagDocument.active == True)
+        )
+        vectors = [np.asarray(vector, dtype=np.float32) for vector in rows]
+    await engine.dispose()
+    return normalize(np.vstack(vectors)).astype(np.float32)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main(args) -> None:
+    rng = np.random.default_rng(0)
+    if args.language:
+        corpus = asyncio.run(corpus_from_database(args.language))
+    else:
+        corpus = synthetic_corpus(args.corpus, args.dim, rng)
+
+    # Queries: perturbed corpus rows, like paraphrases of indexed content
+    picks = rng.integers(0, len(corpus), args.queries)
+    queries = normalize(corpus[picks] + 0.5 * rng.standard_normal((args.queries, corpus.shape[1]))).astype(np.float32)
+
+    half_corpus = corpus.astype(np.float16).astype(np.float32)
+    half_queries = queries.astype(np.float16).astype(np.float32)
+
+    k = min(args.k, len(corpus))
+    exact = top_k(corpus, queries, k)
+    approx = top_k(half_corpus, half_queries, k)
+    recall = np.mean([len(set(e) & set(a)) / k for e, a in zip(exact, approx)])
+
+    error = np.abs(queries @ corpus.T - half_queries @ half_corpus.T).max()
+    print(f'{len(corpus)} vectors x {corpus.shape[1]} dims, {args.queries} queries')
+    print(f'recall@{k} (halfvec vs vector): {recall:.4f}')
+    print(f'max cosine error:              {error:.2e}')
+    print(f'storage per vector:            {corpus.shape[1] * 4 + 8} B vector, {corpus.shape[1] * 2 + 8} B halfvec')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--language', choices=['en', 'es', 'pt'], help='use stored embeddings instead of synthetic ones')
+    parser.add_argument('--corpus', type=int, default=5000)
+    parser.add_argument('--dim', type=int, default=1536)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,64 @@
+"""
+Ingestion embedding throughput: one call per chunk vs. batched + concurrent.
+
+Uses a fake provider with a fixed per-request round trip plus a small
+per-text cost, so the numbers reflect request overhead rather than the
+network of the machine running the benchmark.
+
+    poetry run python -m benchmarks.bench_ingestion --chunks 200
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.embedding_batcher import embed_in_batches
+
+
+class FakeEmbeddings:
+    def __init__(self, round_trip: float, per_text: float, dim: int = 1536):
+        self.round_trip = round_trip
+        self.per_text = per_text
+        self.dim = dim
+        self.calls = 0
+
+    async def aembed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        await asyncio.sleep(self.round_trip + self.per_text)
+        return [0.0] * self.dim
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.round_trip + self.per_text * len(texts))
+        return [[0.0] * self.dim for _ in texts]
+
+
+async def sequential(provider: FakeEmbeddings, texts: list[str]) -> list[list[float]]:
+    # The previous ingestion loop: one awaited request per chunk
+    return [await provider.aembed_query(text) for text in texts]
+
+
+async def main(args) -> None:
+    texts = [f'chunk {i} ' * 100 for i in range(args.chunks)]
+
+    for label, run in (
+        ('sequential aembed_query', lambda p: sequential(p, texts)),
+        (f'batched x{args.batch_size}, {args.concurrency} in flight', lambda p: embed_in_batches(
+            texts, p.aembed_documents, batch_size=args.batch_size, concurrency=args.concurrency
+        )),
+    ):
+        provider = FakeEmbeddings(args.round_trip, args.per_text)
+        start = time.perf_counter()
+        vectors = await run(provider)
+        elapsed = time.perf_counter() - start
+        assert len(vectors) == len(texts)
+        print(f'{label:<36} {elapsed:7.2f}s  {len(texts) / elapsed:9.1f} chunks/s  {provider.calls:4d} calls')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--round-trip', type=float, default=0.15, help='seconds per provider request')
+    parser.add_argument('--per-text', type=float, default=0.002, help='extra seconds per embedded text')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""
+Two-stage retrieval: recall@k and latency against single-stage search.
+
+Single stage ranks every chunk with the full 1536-dim embedding. Two stage
+ranks with the normalized leading 256 dims, then re-ranks the top
+--candidates with the full vectors. Both are exact (brute force) here, so
+the latency gap is the compute ratio; in Postgres the gain is the smaller
+HNSW index that stays in cache.
+
+The synthetic corpus concentrates variance in the leading dimensions, as
+Matryoshka-trained embeddings do. Use --language to measure stored chunks.
+
+    poetry run python -m benchmarks.bench_two_stage_retrieval
+    poetry run python -m benchmarks.bench_two_stage_retrieval --language en --candidates 30
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.models.rag_documents import SHORT_EMBEDDING_DIM
+from benchmarks.bench_halfvec_recall import corpus_from_database, normalize
+
+
+def decay(dim: int) -> np.ndarray:
+    # Earlier dimensions carry more of the signal
+    return 1 / np.sqrt(1 + np.arange(dim) / 64)
+
+
+def matryoshka_corpus(size: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((max(1, size // 50), dim))
+    assignment = rng.integers(0, len(centers), size)
+    vectors = centers[assignment] + 0.6 * rng.standard_normal((size, dim))
+    return normalize(vectors * decay(dim)).astype(np.float32)
+
+
+def single_stage(corpus: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = corpus @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def two_stage(corpus: np.ndarray, short_corpus: np.ndarray, query: np.ndarray, k: int, candidates: int) -> np.ndarray:
+    short_query = normalize(query[None, :SHORT_EMBEDDING_DIM])[0]
+    coarse = np.argpartition(-(short_corpus @ short_query), candidates - 1)[:candidates]
+    scores = corpus[coarse] @ query
+    return coarse[np.argsort(-scores)[:k]]
+
+
+def main(args) -> None:
+    rng = np.random.default_rng(0)
+    if args.language:
+        corpus = asyncio.run(corpus_from_database(args.language))
+    else:
+        corpus = matryoshka_corpus(args.corpus, args.dim, rng)
+
+    short_corpus = np.ascontiguousarray(normalize(corpus[:, :SHORT_EMBEDDING_DIM]), dtype=np.float32)
+    picks = rng.integers(0, len(corpus), args.queries)
+    noise = 0.5 * rng.standard_normal((args.queries, corpus.shape[1])) * decay(corpus.shape[1])
+    queries = normalize(corpus[picks] + noise).astype(np.float32)
+
+    k = min(args.k, len(corpus))
+    candidates = min(max(k, args.candidates), len(corpus))
+
+    start = time.perf_counter()
+    exact = [single_stage(corpus, query, k) for query in queries]
+    single_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    start = time.perf_counter()
+    approx = [two_stage(corpus, short_corpus, query, k, candidates) for query in queries]
+    two_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    recall = np.mean([len(set(e) & set(a)) / k for e, a in zip(exact, approx)])
+    print(f'{len(corpus)} vectors, {args.queries} queries, {candidates} candidates')
+    print(f'single stage ({corpus.shape[1]} dims): {single_ms:7.3f} ms/query')
+    print(f'two stage ({SHORT_EMBEDDING_DIM} -> {corpus.shape[1]}):   {two_ms:7.3f} ms/query   recall@{k} {recall:.4f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--language', choices=['en', 'es', 'pt'], help='use stored embeddings instead of synthetic ones')
+    parser.add_argument('--corpus', type=int, default=20000)
+    parser.add_argument('--dim', type=int, default=1536)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--candidates', type=int, default=50)
+    parser.add_argument('--k', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,46 @@
+"""
+pgvector wire format: text vs. binary encode/decode throughput.
+
+Measures the client-side work per 1536-dim vector: formatting the query
+vector for the bind parameter and parsing stored embeddings from results.
+No database is needed; the payload sizes are what travels over the wire.
+
+    poetry run python -m benchmarks.bench_vector_codec --vectors 2000
+"""
+import argparse
+import time
+
+import numpy as np
+from pgvector.utils import Vector
+
+
+def bench(label: str, encode, decode, vectors: list[list[float]]) -> None:
+    start = time.perf_counter()
+    payloads = [encode(vector) for vector in vectors]
+    encoded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload in payloads:
+        decode(payload)
+    decoded = time.perf_counter() - start
+
+    count = len(vectors)
+    size = sum(len(payload) for payload in payloads) / count
+    print(
+        f'{label:<8} encode {count / encoded:9.0f} vec/s   '
+        f'decode {count / decoded:9.0f} vec/s   {size:7.0f} bytes/vec'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=2000)
+    parser.add_argument('--dim', type=int, default=1536)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Embedding APIs return Python lists of floats
+    vectors = rng.standard_normal((args.vectors, args.dim)).astype(np.float32).tolist()
+
+    bench('text', lambda v: Vector._to_db(v).encode(), lambda p: Vector._from_db(p.decode()), vectors)
+    bench('binary', Vector._to_db_binary, Vector._from_db_binary, vectors)
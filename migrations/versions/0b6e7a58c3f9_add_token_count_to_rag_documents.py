@@ -0,0 +1,35 @@
+"""Add token count to rag_documents
+
+Revision ID: 0b6e7a58c3f9
+Revises: f58a0d2c91b7
+Create Date: 2026-03-10 14:22:09.733561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e7a58c3f9'
+down_revision: Union[str, Sequence[str], None] = 'f58a0d2c91b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rag_documents', sa.Column('token_count', sa.Integer(), nullable=True))
+
+    # Existing rows get the ~4 characters/token estimate; new chunks are counted with tiktoken
+    op.execute("UPDATE rag_documents SET token_count = GREATEST(1, length(content) / 4)")
+
+    op.alter_column('rag_documents', 'token_count',
+               existing_type=sa.Integer(),
+               nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rag_documents', 'token_count')
@@ -0,0 +1,28 @@
+"""Add updated_at to rag_documents
+
+Revision ID: 4e8b2c6d1a93
+Revises: b83f5c1d07e2
+Create Date: 2026-03-14 10:21:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8b2c6d1a93'
+down_revision: Union[str, Sequence[str], None] = 'b83f5c1d07e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rag_documents', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rag_documents', 'updated_at')
@@ -0,0 +1,30 @@
+"""Add last_used_at to embedding_cache
+
+Revision ID: 6a1d9f3e7b25
+Revises: 4e8b2c6d1a93
+Create Date: 2026-03-14 15:06:52.903417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1d9f3e7b25'
+down_revision: Union[str, Sequence[str], None] = '4e8b2c6d1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('embedding_cache', sa.Column('last_used_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_embedding_cache_last_used_at', 'embedding_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_embedding_cache_last_used_at', table_name='embedding_cache')
+    op.drop_column('embedding_cache', 'last_used_at')
@@ -0,0 +1,58 @@
+"""Add half-precision embedding to rag_documents
+
+Revision ID: 9d4e2b7a1f60
+Revises: 7c31d9e4b2a8
+Create Date: 2026-03-12 09:31:05.274916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4e2b7a1f60'
+down_revision: Union[str, Sequence[str], None] = '7c31d9e4b2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LANGUAGES = ('en', 'es', 'pt')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled by `python -m app.services.embedding_backfill`, not here: rewriting
+    # every row in the migration would hold a long lock on a large corpus
+    op.add_column('rag_documents', sa.Column('embedding_half', HALFVEC(1536), nullable=True))
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for language in LANGUAGES:
+            op.create_index(
+                f'ix_rag_documents_embedding_half_hnsw_{language}',
+                'rag_documents',
+                ['embedding_half'],
+                unique=False,
+                postgresql_using='hnsw',
+                postgresql_with={'m': 16, 'ef_construction': 64},
+                postgresql_ops={'embedding_half': 'halfvec_cosine_ops'},
+                postgresql_where=sa.text(f"active = true AND language = '{language}'"),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for language in LANGUAGES:
+            op.drop_index(
+                f'ix_rag_documents_embedding_half_hnsw_{language}',
+                table_name='rag_documents',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+    op.drop_column('rag_documents', 'embedding_half')
@@ -0,0 +1,51 @@
+"""Add HNSW indexes to rag_documents
+
+Revision ID: a41c9e27d5b3
+Revises: 678097a2072c
+Create Date: 2026-03-02 10:12:44.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c9e27d5b3'
+down_revision: Union[str, Sequence[str], None] = '678097a2072c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LANGUAGES = ('en', 'es', 'pt')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for language in LANGUAGES:
+            op.create_index(
+                f'ix_rag_documents_embedding_hnsw_{language}',
+                'rag_documents',
+                ['embedding'],
+                unique=False,
+                postgresql_using='hnsw',
+                postgresql_with={'m': 16, 'ef_construction': 64},
+                postgresql_ops={'embedding': 'vector_cosine_ops'},
+                postgresql_where=sa.text(f"active = true AND language = '{language}'"),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for language in LANGUAGES:
+            op.drop_index(
+                f'ix_rag_documents_embedding_hnsw_{language}',
+                table_name='rag_documents',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
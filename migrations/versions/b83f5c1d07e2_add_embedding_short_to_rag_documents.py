@@ -0,0 +1,57 @@
+"""Add shortened embedding to rag_documents
+
+Revision ID: b83f5c1d07e2
+Revises: 9d4e2b7a1f60
+Create Date: 2026-03-13 11:58:40.602317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83f5c1d07e2'
+down_revision: Union[str, Sequence[str], None] = '9d4e2b7a1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LANGUAGES = ('en', 'es', 'pt')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled by `python -m app.services.embedding_backfill` (l2_normalize(subvector(embedding, 1, 256)))
+    op.add_column('rag_documents', sa.Column('embedding_short', Vector(256), nullable=True))
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for language in LANGUAGES:
+            op.create_index(
+                f'ix_rag_documents_embedding_short_hnsw_{language}',
+                'rag_documents',
+                ['embedding_short'],
+                unique=False,
+                postgresql_using='hnsw',
+                postgresql_with={'m': 16, 'ef_construction': 64},
+                postgresql_ops={'embedding_short': 'vector_cosine_ops'},
+                postgresql_where=sa.text(f"active = true AND language = '{language}'"),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for language in LANGUAGES:
+            op.drop_index(
+                f'ix_rag_documents_embedding_short_hnsw_{language}',
+                table_name='rag_documents',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+    op.drop_column('rag_documents', 'embedding_short')
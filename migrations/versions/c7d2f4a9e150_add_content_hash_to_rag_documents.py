@@ -0,0 +1,41 @@
+"""Add content hash to rag_documents
+
+Revision ID: c7d2f4a9e150
+Revises: 5b0e83f1c6a2
+Create Date: 2026-03-05 11:27:52.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2f4a9e150'
+down_revision: Union[str, Sequence[str], None] = '5b0e83f1c6a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rag_documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # Same digest as compute_content_hash() in app.models.rag_documents
+    op.execute(
+        "UPDATE rag_documents "
+        "SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')"
+    )
+
+    op.alter_column('rag_documents', 'content_hash',
+               existing_type=sa.String(length=64),
+               nullable=False)
+    op.create_index('ix_rag_documents_source_language_hash', 'rag_documents',
+                    ['source', 'language', 'content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rag_documents_source_language_hash', table_name='rag_documents')
+    op.drop_column('rag_documents', 'content_hash')
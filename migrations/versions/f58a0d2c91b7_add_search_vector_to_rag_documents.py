@@ -0,0 +1,61 @@
+"""Add search vector to rag_documents
+
+Revision ID: f58a0d2c91b7
+Revises: e19b6c03a7d4
+Create Date: 2026-03-09 09:48:16.170382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f58a0d2c91b7'
+down_revision: Union[str, Sequence[str], None] = 'e19b6c03a7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "CASE language "
+    "WHEN 'en' THEN to_tsvector('english'::regconfig, content) "
+    "WHEN 'es' THEN to_tsvector('spanish'::regconfig, content) "
+    "WHEN 'pt' THEN to_tsvector('portuguese'::regconfig, content) "
+    "ELSE to_tsvector('simple'::regconfig, content) END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rag_documents', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        # to_tsvector never returns NULL (content is NOT NULL), matching the model
+        nullable=False
+    ))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_rag_documents_search_vector',
+            'rag_documents',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_rag_documents_search_vector',
+            table_name='rag_documents',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('rag_documents', 'search_vector')